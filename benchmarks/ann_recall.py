@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Vector index recall/latency benchmark
+
+Loads a corpus of embeddings into Redis under a scratch prefix, builds one
+index per configuration (FLAT/HNSW, FLOAT32/FLOAT16/INT8, reduced dimension,
+with or without float32 rescoring), and compares each against exact
+brute-force top-k over the uncompressed vectors computed with NumPy.
+Reports recall@k, p50/p99 query latency and vector index memory so the
+index config for create_vector_index can be picked from measurements.
+
+    python benchmarks/ann_recall.py --source synthetic --n 20000 --k 10
+    python benchmarks/ann_recall.py --source redis --json ann_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from redis_ai_client import (RedisAIClient, DEFAULT_EMBEDDING_DIM, VECTOR_DTYPES, encode_vector, int8_scale,
+                             prepare_vector, rescore_knn_result, rescore_search_args, scale_field_name,
+                             vector_field_name)
+from redis_connections import reply_map, search_hits
+
+PREFIX = "annbench"
+
+DEFAULT_CONFIGS = [
+    {"algorithm": "FLAT", "vector_type": "FLOAT32", "dim": 1536},
+    {"algorithm": "HNSW", "vector_type": "FLOAT32", "dim": 1536, "m": 16, "ef_construction": 200, "ef_runtime": 10},
+    {"algorithm": "HNSW", "vector_type": "FLOAT32", "dim": 1536, "m": 16, "ef_construction": 200, "ef_runtime": 50},
+    {"algorithm": "HNSW", "vector_type": "FLOAT32", "dim": 1536, "m": 32, "ef_construction": 400, "ef_runtime": 100},
+    {"algorithm": "HNSW", "vector_type": "FLOAT16", "dim": 1536, "m": 16, "ef_construction": 200, "ef_runtime": 50},
+    {"algorithm": "HNSW", "vector_type": "FLOAT32", "dim": 512, "m": 16, "ef_construction": 200, "ef_runtime": 50},
+    {"algorithm": "HNSW", "vector_type": "FLOAT16", "dim": 512, "m": 16, "ef_construction": 200, "ef_runtime": 50},
+    {"algorithm": "FLAT", "vector_type": "INT8", "dim": 1536},
+    {"algorithm": "FLAT", "vector_type": "INT8", "dim": 1536, "rescore": 4},
+    {"algorithm": "HNSW", "vector_type": "FLOAT16", "dim": 1536, "m": 16, "ef_construction": 200, "ef_runtime": 50,
+     "rescore": 4},
+    {"algorithm": "HNSW", "vector_type": "INT8", "dim": 1536, "m": 16, "ef_construction": 200, "ef_runtime": 50},
+    {"algorithm": "HNSW", "vector_type": "INT8", "dim": 1536, "m": 16, "ef_construction": 200, "ef_runtime": 50,
+     "rescore": 4},
+]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def synthetic_corpus(n: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embedding distributions than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    assignment = rng.integers(0, clusters, n)
+    return normalize(centers[assignment] + 0.5 * rng.standard_normal((n, dim), dtype=np.float32))
+
+
+def redis_corpus(client: RedisAIClient, index_name: str = "rag_docs") -> np.ndarray:
+    """Full-size float32 vectors of the ingested corpus"""
+    keys = list(client.redis_client.scan_iter(match=f"{index_name}:*", count=1000, _type="HASH"))
+    pipe = client.redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hget(key, "embedding")
+    vectors = [np.frombuffer(value, dtype=np.float32) for value in pipe.execute() if value is not None]
+    return normalize(np.vstack(vectors))
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force cosine top-k ids per query"""
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def load_corpus(client: RedisAIClient, corpus: np.ndarray, configs, batch_size: int = 500):
+    """Write every vector shape needed by the configs under the scratch prefix"""
+    shapes = {(config["dim"], config["vector_type"]) for config in configs}
+    pipe = client.redis_client.pipeline(transaction=False)
+    for i, vector in enumerate(corpus):
+        mapping = {}
+        for dim, vector_type in shapes:
+            field = vector_field_name(dim, vector_type)
+            mapping[field] = encode_vector(vector, dim, vector_type)
+            if vector_type == "INT8":
+                mapping[scale_field_name(field)] = int8_scale(prepare_vector(vector, dim))
+        pipe.hset(f"{PREFIX}:{i}", mapping=mapping)
+        if (i + 1) % batch_size == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def run_config(client: RedisAIClient, index_name: str, config, queries: np.ndarray, truth: np.ndarray, k: int):
+    start = time.perf_counter()
+    if client.index_exists(index_name):
+        client.redis_client.execute_command("FT.DROPINDEX", index_name)
+    client.create_vector_index(
+        index_name, dim=config["dim"], algorithm=config["algorithm"], vector_type=config["vector_type"],
+        m=config.get("m", 16), ef_construction=config.get("ef_construction", 200),
+        ef_runtime=config.get("ef_runtime", 10), prefix=PREFIX)
+    client.wait_for_indexing(index_name)
+    build_seconds = time.perf_counter() - start
+    index_mb = float(reply_map(client.redis_client.execute_command("FT.INFO", index_name))[b"vector_index_sz_mb"])
+
+    latencies, recalls = [], []
+    ef = f" EF_RUNTIME {config['ef_runtime']}" if config["algorithm"] == "HNSW" else ""
+    field = vector_field_name(config["dim"], config["vector_type"])
+    for query, expected in zip(queries, truth):
+        vec = encode_vector(query, config["dim"], config["vector_type"])
+        start = time.perf_counter()
+        if config.get("rescore"):
+            # The coarse search returns candidate vectors; rescoring them is part of the measured latency
+            result = client.redis_client.execute_command(*rescore_search_args(
+                vec, k * config["rescore"], index_name, field, config.get("ef_runtime") if ef else None))
+            hits = rescore_knn_result(result, query, k, config["dim"], config["vector_type"], field)
+            keys = [hit["id"] for hit in hits]
+        else:
+            result = client.redis_client.execute_command(
+                "FT.SEARCH", index_name, f"*=>[KNN {k} @embedding $vec{ef} AS score]",
+                "PARAMS", "2", "vec", vec, "SORTBY", "score", "ASC",
+                "RETURN", "1", "score", "DIALECT", "2", "LIMIT", "0", str(k))
+            keys = [key.decode() for key, _ in search_hits(result)]
+        latencies.append(time.perf_counter() - start)
+        found = {int(key.rsplit(":", 1)[1]) for key in keys}
+        recalls.append(len(found & set(expected.tolist())) / k)
+    client.redis_client.execute_command("FT.DROPINDEX", index_name)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        **config,
+        "recall_at_k": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "build_seconds": build_seconds,
+        "index_mb": index_mb,
+        "vector_bytes": config["dim"] * np.dtype(VECTOR_DTYPES[config["vector_type"]]).itemsize,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["synthetic", "redis"], default="synthetic")
+    parser.add_argument("--n", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch vectors in Redis")
+    args = parser.parse_args()
+
+    client = RedisAIClient()
+    if args.source == "redis":
+        corpus = redis_corpus(client)
+    else:
+        corpus = synthetic_corpus(args.n, DEFAULT_EMBEDDING_DIM)
+    rng = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors, so each has a meaningful neighbourhood
+    picks = rng.integers(0, len(corpus), args.queries)
+    queries = normalize(corpus[picks] + 0.05 * rng.standard_normal((args.queries, corpus.shape[1]), dtype=np.float32))
+    truth = exact_top_k(corpus, queries, args.k)
+
+    print(f"Loading {len(corpus)} vectors...")
+    load_corpus(client, corpus, DEFAULT_CONFIGS)
+
+    results = []
+    print(f"{'algorithm':>9} {'type':>8} {'dim':>5} {'M':>4} {'efC':>5} {'efR':>5} {'rescore':>7} "
+          f"{'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'index MB':>9} {'vec B':>6}")
+    for i, config in enumerate(DEFAULT_CONFIGS):
+        try:
+            result = run_config(client, f"{PREFIX}_idx_{i}", config, queries, truth, args.k)
+        except Exception as e:
+            print(f"Skipping {config}: {e}")
+            continue
+        results.append(result)
+        print(f"{result['algorithm']:>9} {result['vector_type']:>8} {result['dim']:>5} "
+              f"{result.get('m', '-'):>4} {result.get('ef_construction', '-'):>5} {result.get('ef_runtime', '-'):>5} "
+              f"{result.get('rescore', '-'):>7} {result['recall_at_k']:>10.3f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['build_seconds']:>8.1f} {result['index_mb']:>9.1f} "
+              f"{result['vector_bytes']:>6}")
+
+    if not args.keep:
+        for key in client.redis_client.scan_iter(match=f"{PREFIX}:*", count=1000):
+            client.redis_client.unlink(key)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"n": len(corpus), "k": args.k, "queries": args.queries, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Async load benchmark
+
+Runs many concurrent sessions through RedisAILangGraphAgent.aprocess_message
+on one event loop, against a local Redis with a stubbed LLM and stubbed
+embeddings, and reports how throughput scales with concurrency.
+
+    python benchmarks/async_load.py --concurrency 1 10 100 500 --turns 3
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from redis_ai_client import RedisAIClient, AsyncRedisAIClient
+from agent import RedisAILangGraphAgent
+
+
+class StubMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubLLM:
+    """Chat model stand-in that answers after a fixed latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return StubMessage("stub answer")
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return StubMessage("stub answer")
+
+
+class StubEmbeddingsClient(AsyncRedisAIClient):
+    """AsyncRedisAIClient whose embeddings are deterministic vectors served after a fixed latency"""
+
+    def __init__(self, latency: float, dim: int = 1536, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.dim = dim
+
+    async def embed_texts(self, texts):
+        await asyncio.sleep(self.latency)
+        return [np.random.default_rng(abs(hash(text)) % 2**32).random(self.dim, dtype=np.float32).tolist()
+                for text in texts]
+
+
+async def run_sessions(agent, concurrency: int, turns: int) -> float:
+    async def session(n):
+        session_id = f"bench-{concurrency}-{n}-{time.time_ns()}"
+        for turn in range(turns):
+            await agent.aprocess_message(f"Question {turn} from session {n}", session_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(n) for n in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM latency in seconds")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Stub embedding latency in seconds")
+    parser.add_argument("--max-connections", type=int, default=200)
+    args = parser.parse_args()
+
+    RedisAIClient().create_vector_index()
+    async_client = StubEmbeddingsClient(args.embed_latency, max_connections=args.max_connections)
+    agent = RedisAILangGraphAgent(RedisAIClient(), os.environ["OPENAI_API_KEY"], async_redis_client=async_client)
+    agent.llm = StubLLM(args.llm_latency)
+
+    print(f"{'sessions':>8} {'turns':>8} {'seconds':>8} {'turns/s':>10}")
+    for concurrency in args.concurrency:
+        elapsed = await run_sessions(agent, concurrency, args.turns)
+        print(f"{concurrency:>8} {concurrency * args.turns:>8} {elapsed:>8.2f} {concurrency * args.turns / elapsed:>10.1f}")
+    await async_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Deterministic stand-in for the OpenAI embeddings and chat completions API
+
+Serves /v1/embeddings and /v1/chat/completions (including streaming) on a
+local port with a configurable fixed latency. Embeddings are unit vectors
+seeded from a hash of the input text, so the same text always gets the same
+vector; chat answers are a fixed number of words derived from the prompt.
+
+    python benchmarks/fake_openai.py --port 8089 --embed-latency 0.05 --chat-latency 0.3
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_BASE=http://127.0.0.1:8089/v1 python src/main.py
+"""
+
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+DEFAULT_DIM = 1536
+WORDS = ("redis", "model", "tensor", "graph", "vector", "index", "query", "script", "cluster", "stream",
+         "module", "command", "latency", "memory", "shard", "key")
+
+
+def fake_embedding(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def fake_answer(prompt: str, words: int) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return " ".join(WORDS[digest[i % len(digest)] % len(WORDS)] for i in range(words))
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+class FakeOpenAIServer:
+    """Threaded local HTTP server speaking the subset of the OpenAI API the agent uses"""
+
+    def __init__(self, embed_latency: float = 0.05, chat_latency: float = 0.3, answer_words: int = 40,
+                 token_latency: float = 0.0):
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.answer_words = answer_words
+        self.token_latency = token_latency
+        self.requests = {"embeddings": 0, "chat": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self, port: int = 0, host: str = "127.0.0.1") -> str:
+        """Serve from a daemon thread; port 0 picks a free port. Returns the API base URL"""
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.requests[kind] += 1
+
+    def embeddings(self, body: dict) -> dict:
+        self._count("embeddings")
+        time.sleep(self.embed_latency)
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dim = body.get("dimensions") or DEFAULT_DIM
+        data = []
+        for i, text in enumerate(texts):
+            vector = fake_embedding(text, dim)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(count_words(text) for text in texts)
+        return {"object": "list", "data": data, "model": body.get("model", "fake"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def chat(self, body: dict):
+        """Completion dict, or a list of stream chunk dicts when stream is set"""
+        self._count("chat")
+        time.sleep(self.chat_latency)
+        prompt = "\n".join(str(message.get("content", "")) for message in body["messages"])
+        answer = fake_answer(prompt, self.answer_words)
+        usage = {"prompt_tokens": count_words(prompt), "completion_tokens": self.answer_words,
+                 "total_tokens": count_words(prompt) + self.answer_words}
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "fake")}
+        if not body.get("stream"):
+            return {**base, "object": "chat.completion", "usage": usage, "choices": [{
+                "index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": answer}}]}
+        chunks = [{**base, "object": "chat.completion.chunk", "choices": [{
+            "index": 0, "finish_reason": None, "delta": {"role": "assistant", "content": ""}}]}]
+        for word in answer.split(" "):
+            chunks.append({**base, "object": "chat.completion.chunk", "choices": [{
+                "index": 0, "finish_reason": None, "delta": {"content": word + " "}}]})
+        chunks.append({**base, "object": "chat.completion.chunk", "usage": usage, "choices": [{
+            "index": 0, "finish_reason": "stop", "delta": {}}]})
+        return chunks
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path.endswith("/embeddings"):
+                    self._json(server.embeddings(body))
+                elif self.path.endswith("/chat/completions"):
+                    reply = server.chat(body)
+                    if isinstance(reply, list):
+                        self._stream(reply)
+                    else:
+                        self._json(reply)
+                else:
+                    self._json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+            def _json(self, payload: dict, status: int = 200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, chunks: list):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in chunks:
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if server.token_latency:
+                        time.sleep(server.token_latency)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Seconds per embeddings request")
+    parser.add_argument("--chat-latency", type=float, default=0.3, help="Seconds before a completion starts")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed tokens")
+    parser.add_argument("--answer-words", type=int, default=40)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.embed_latency, args.chat_latency, args.answer_words, args.token_latency)
+    print(f"Fake OpenAI API at {server.start(args.port)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
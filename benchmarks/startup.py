@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the CLI and worker entry points
+
+Imports each entry module in a fresh interpreter under `python -X importtime`
+and reports its import time, the wall time of the whole process and the
+packages that account for most of the import. OPENAI_API_KEY is removed from
+the child's environment, so a module that needs credentials at import time
+fails the run. Any target over its budget exits with code 1.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 7 --json startup.json
+    python benchmarks/startup.py --budget-ms main=300 server=600
+
+The same measurements run as the startup stage of suite.py, where they are
+gated against a baseline like the other *_ms metrics.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Import-time budgets (ms) per entry module, roughly twice the time on a laptop with warm bytecode caches
+STARTUP_BUDGETS_MS = {
+    "main": 400,
+    "server": 800,
+    "ingest_redis_doc": 400,
+    "agent": 400,
+}
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, int, str]]:
+    """(self_us, cumulative_us, depth, module) per -X importtime line, in output order (children first)"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((int(match.group(1)), int(match.group(2)), (len(match.group(3)) - 1) // 2,
+                            match.group(4)))
+    return entries
+
+
+def import_subtree(entries: List[Tuple[int, int, int, str]], module: str) -> List[Tuple[int, int, int, str]]:
+    """Lines of module's own import: its top-level line and the nested imports listed just before it"""
+    end = max(i for i, (_, _, depth, name) in enumerate(entries) if depth == 0 and name == module)
+    start = end
+    while start > 0 and entries[start - 1][2] > 0:
+        start -= 1
+    return entries[start:end + 1]
+
+
+def package_times(subtree: List[Tuple[int, int, int, str]], top: int = 5) -> List[Tuple[str, float]]:
+    """Slowest top-level packages by summed self time (ms), e.g. all openai.* modules under openai"""
+    totals = defaultdict(int)
+    for self_us, _, _, name in subtree:
+        totals[name.split(".")[0]] += self_us
+    return [(name, us / 1000) for name, us in sorted(totals.items(), key=lambda item: -item[1])[:top]]
+
+
+def measure_once(module: str) -> Dict:
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=SRC_DIR, env=env,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.splitlines()[-1] if proc.stderr else ''}")
+    subtree = import_subtree(parse_importtime(proc.stderr), module)
+    return {"import_ms": subtree[-1][1] / 1000, "wall_ms": wall * 1000, "modules": len(subtree),
+            "packages": package_times(subtree)}
+
+
+def measure(module: str, repeat: int = 5) -> Dict:
+    """Median import and wall time over repeat fresh interpreters, with the package breakdown of the median run"""
+    runs = sorted((measure_once(module) for _ in range(repeat)), key=lambda run: run["import_ms"])
+    median = runs[len(runs) // 2]
+    return {
+        "import_ms": median["import_ms"],
+        "wall_ms": statistics.median(run["wall_ms"] for run in runs),
+        "modules": median["modules"],
+        "packages": {name: ms for name, ms in median["packages"]},
+    }
+
+
+def bench_startup(targets: List[str], repeat: int = 5) -> Dict[str, Dict]:
+    return {module: measure(module, repeat) for module in targets}
+
+
+def over_budget(results: Dict[str, Dict], budgets: Dict[str, float]) -> List[str]:
+    return [module for module, result in results.items()
+            if module in budgets and result["import_ms"] > budgets[module]]
+
+
+def parse_budgets(pairs: List[str]) -> Dict[str, float]:
+    budgets = dict(STARTUP_BUDGETS_MS)
+    for pair in pairs:
+        module, _, ms = pair.partition("=")
+        budgets[module] = float(ms)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=list(STARTUP_BUDGETS_MS), help="Modules in src/ to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per target (median is reported)")
+    parser.add_argument("--budget-ms", nargs="*", default=[], metavar="MODULE=MS",
+                        help="Override import-time budgets")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    budgets = parse_budgets(args.budget_ms)
+    results = bench_startup(args.targets, args.repeat)
+    for module, result in results.items():
+        budget = budgets.get(module)
+        status = "" if budget is None else (f"  budget {budget:.0f} ms " +
+                                            ("OVER BUDGET" if result["import_ms"] > budget else "ok"))
+        print(f"{module:<18} import {result['import_ms']:7.1f} ms  wall {result['wall_ms']:7.1f} ms{status}")
+        print("    " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in result["packages"].items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"startup": results, "budgets_ms": budgets}, f, indent=2)
+    if over_budget(results, budgets):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Reproducible end-to-end benchmark suite
+
+Starts a throwaway redis-stack server (the redis-stack-server binary, or the
+redis/redis-stack-server Docker image) and the deterministic fake OpenAI API
+from fake_openai.py in a separate process, then measures:
+
+  ingestion   IngestPipeline throughput over a synthetic markdown corpus
+  retrieval   vector and hybrid search p50/p99 versus corpus size
+  sessions    process_message p50/p99 and throughput for N concurrent sessions,
+              plus Redis memory and process RSS per session
+  startup     import time of the CLI and worker entry modules (see startup.py;
+              needs no servers)
+
+Results are written as JSON. With --baseline, any gated metric (*_ms lower is
+better, *_per_s higher is better, *_bytes lower is better) that is worse than
+the baseline by more than --tolerance fails the run with exit code 1.
+
+    python benchmarks/suite.py --json results.json
+    python benchmarks/suite.py --json new.json --baseline results.json --tolerance 0.2
+
+--redis-port reuses a running redis-stack instead; the suite writes the
+rag_docs index and bench* keys there, so only point it at a scratch server.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import platform
+import resource
+import tempfile
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import redis
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+# Modules from src/ are imported inside the stages, once OPENAI_BASE_URL and REDIS_*
+# point at the local servers
+
+from fake_openai import WORDS
+from startup import STARTUP_BUDGETS_MS, bench_startup
+
+GATED_SUFFIXES = {"_ms": "lower", "_bytes": "lower", "_per_s": "higher"}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until(check, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{what} did not come up within {timeout}s")
+        time.sleep(0.2)
+
+
+class LocalServers:
+    """redis-stack and the fake OpenAI API for the duration of a run"""
+
+    def __init__(self, redis_port: int = None, embed_latency: float = 0.05, chat_latency: float = 0.3,
+                 answer_words: int = 40):
+        self.redis_port = redis_port
+        self.owns_redis = redis_port is None
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.answer_words = answer_words
+        self._redis_process = None
+        self._container = None
+        self._fake_openai = None
+
+    def __enter__(self):
+        if self.owns_redis:
+            self.redis_port = free_port()
+            if shutil.which("redis-stack-server"):
+                self._redis_process = subprocess.Popen(
+                    ["redis-stack-server", "--port", str(self.redis_port), "--save", "", "--appendonly", "no"],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elif shutil.which("docker"):
+                self._container = subprocess.check_output(
+                    ["docker", "run", "-d", "--rm", "-p", f"{self.redis_port}:6379", "redis/redis-stack-server:latest"],
+                    text=True).strip()
+            else:
+                raise SystemExit("Need redis-stack-server or docker on PATH, or --redis-port of a scratch redis-stack")
+        wait_until(lambda: redis.Redis(port=self.redis_port).ping(), 60, "redis-stack")
+
+        openai_port = free_port()
+        self._fake_openai = subprocess.Popen(
+            [sys.executable, os.path.join(BENCH_DIR, "fake_openai.py"), "--port", str(openai_port),
+             "--embed-latency", str(self.embed_latency), "--chat-latency", str(self.chat_latency),
+             "--answer-words", str(self.answer_words)],
+            stdout=subprocess.DEVNULL)
+        wait_until(lambda: socket.create_connection(("127.0.0.1", openai_port), timeout=1).close() is None,
+                   30, "fake OpenAI API")
+
+        base_url = f"http://127.0.0.1:{openai_port}/v1"
+        os.environ.update({
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": base_url,   # openai SDK
+            "OPENAI_API_BASE": base_url,   # langchain-openai
+            "REDIS_HOST": "localhost",
+            "REDIS_PORT": str(self.redis_port),
+            "REDIS_DB": "0",
+        })
+        return self
+
+    def __exit__(self, *exc):
+        self._fake_openai.terminate()
+        if self._redis_process is not None:
+            self._redis_process.terminate()
+        if self._container is not None:
+            subprocess.run(["docker", "stop", self._container], stdout=subprocess.DEVNULL)
+
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def write_markdown_corpus(directory: str, files: int, seed: int = 0):
+    """Command-doc-like markdown files with a few sections each"""
+    rng = random.Random(seed)
+    for i in range(files):
+        sections = [f"## {synthetic_text(rng, 3).title()}\n\n{synthetic_text(rng, rng.randint(80, 400))}\n"
+                    for _ in range(rng.randint(2, 6))]
+        with open(os.path.join(directory, f"cmd-{i:05d}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# CMD.{i}\n\n" + "\n".join(sections))
+
+
+def percentiles(seconds: list) -> dict:
+    ms = np.array(seconds) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99))}
+
+
+def bench_ingestion(files: int, workers: int) -> dict:
+    from redis_ai_client import RedisAIClient
+    from ingest_redis_doc import IngestPipeline
+
+    client = RedisAIClient()
+    client.create_vector_index("rag_docs")
+    with tempfile.TemporaryDirectory() as directory:
+        write_markdown_corpus(directory, files)
+        stats = IngestPipeline(client, workers=workers, full=True).run(directory)
+    elapsed = time.perf_counter() - stats.start
+    return {
+        "files": stats.files,
+        "chunks": stats.chunks,
+        "seconds": elapsed,
+        "files_per_s": stats.files / elapsed,
+        "chunks_per_s": stats.chunks / elapsed,
+        "embed_calls": stats.embed_calls,
+        "redis_round_trips": stats.redis_round_trips,
+    }
+
+
+def bench_retrieval(sizes: list, queries: int, k: int) -> list:
+    from redis_ai_client import RedisAIClient, DEFAULT_EMBEDDING_DIM
+    from ann_recall import normalize, synthetic_corpus
+
+    client = RedisAIClient()
+    backend = client.retrieval_backend
+    results = []
+    for size in sizes:
+        index_name = f"benchret_{size}"
+        rng = random.Random(size)
+        corpus = synthetic_corpus(size, DEFAULT_EMBEDDING_DIM, seed=size)
+        texts = [synthetic_text(rng, 60) for _ in range(size)]
+        client.create_vector_index(index_name, algorithm="HNSW")
+        start = time.perf_counter()
+        client.store_documents_with_embeddings(
+            [{"doc_id": str(i), "text": texts[i], "embedding": corpus[i]} for i in range(size)], index_name)
+        client.wait_for_indexing(index_name)
+        load_seconds = time.perf_counter() - start
+
+        noise = np.random.default_rng(size).standard_normal((queries, corpus.shape[1]), dtype=np.float32)
+        picks = [rng.randrange(size) for _ in range(queries)]
+        vectors = normalize(corpus[picks] + 0.05 * noise)
+        query_texts = [" ".join(texts[i].split()[:4]) for i in picks]
+        vector_latencies, hybrid_latencies = [], []
+        for text, vector in zip(query_texts, vectors):
+            start = time.perf_counter()
+            backend.search(vector, k, index_name)
+            vector_latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            backend.hybrid_search_batch([text], [vector], k, index_name)
+            hybrid_latencies.append(time.perf_counter() - start)
+        client.redis_client.execute_command("FT.DROPINDEX", index_name, "DD")
+
+        vector, hybrid = percentiles(vector_latencies), percentiles(hybrid_latencies)
+        results.append({
+            "corpus_size": size,
+            "load_docs_per_s": size / load_seconds,
+            "vector_p50_ms": vector["p50_ms"],
+            "vector_p99_ms": vector["p99_ms"],
+            "hybrid_p50_ms": hybrid["p50_ms"],
+            "hybrid_p99_ms": hybrid["p99_ms"],
+        })
+    return results
+
+
+def session_memory(redis_client, session_ids: list) -> int:
+    """Redis bytes held by the sessions' conversation lists and summaries"""
+    pipe = redis_client.pipeline(transaction=False)
+    for session_id in session_ids:
+        pipe.memory_usage(f"conversation:{session_id}")
+        pipe.memory_usage(f"conversation:{session_id}:summary")
+    return sum(size or 0 for size in pipe.execute())
+
+
+def bench_sessions(levels: list, turns: int) -> list:
+    from redis_ai_client import RedisAIClient
+    from agent import RedisAILangGraphAgent
+
+    client = RedisAIClient()
+    agent = RedisAILangGraphAgent(client, os.environ["OPENAI_API_KEY"])
+    results = []
+    for concurrency in levels:
+        run = time.time_ns()
+        session_ids = [f"bench-{run}-{n}" for n in range(concurrency)]
+        latencies = []
+
+        def session(n):
+            for turn in range(turns):
+                start = time.perf_counter()
+                agent.process_message(f"How do I use the {WORDS[(n + turn) % len(WORDS)]} command, "
+                                      f"question {turn} of session {n}?", session_ids[n])
+                latencies.append(time.perf_counter() - start)
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as sessions:
+            list(sessions.map(session, range(concurrency)))
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        redis_bytes = session_memory(client.redis_client, session_ids)
+        client.redis_client.delete(*[f"conversation:{sid}" for sid in session_ids],
+                                   *[f"conversation:{sid}:summary" for sid in session_ids])
+        results.append({
+            "sessions": concurrency,
+            "turns": len(latencies),
+            **percentiles(latencies),
+            "turns_per_s": len(latencies) / elapsed,
+            "redis_session_bytes": redis_bytes / concurrency,
+            # Peak RSS growth (KB on Linux) spread over the sessions; noisy, so not gated
+            "rss_kb_per_session": max(rss_after - rss_before, 0) / concurrency,
+        })
+    return results
+
+
+def gated_metrics(results: dict) -> dict:
+    """Flat name -> value map of the metrics compared against a baseline"""
+    metrics = {}
+    for key, value in results.get("ingestion", {}).items():
+        metrics[f"ingestion.{key}"] = value
+    for entry in results.get("retrieval", []):
+        for key, value in entry.items():
+            metrics[f"retrieval.{entry['corpus_size']}.{key}"] = value
+    for entry in results.get("sessions", []):
+        for key, value in entry.items():
+            metrics[f"sessions.{entry['sessions']}.{key}"] = value
+    for module, entry in results.get("startup", {}).items():
+        for key in ("import_ms", "wall_ms"):
+            metrics[f"startup.{module}.{key}"] = entry[key]
+    return {name: value for name, value in metrics.items()
+            if any(name.endswith(suffix) for suffix in GATED_SUFFIXES)}
+
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> list:
+    """Gated metrics worse than the baseline by more than tolerance (a fraction)"""
+    found = []
+    for name, old in baseline.items():
+        new = current.get(name)
+        if new is None or not old:
+            continue
+        direction = next(d for suffix, d in GATED_SUFFIXES.items() if name.endswith(suffix))
+        change = (new - old) / old
+        if (direction == "lower" and change > tolerance) or (direction == "higher" and -change > tolerance):
+            found.append({"metric": name, "baseline": old, "current": new, "change": change})
+    return found
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", default=["ingestion", "retrieval", "sessions", "startup"],
+                        choices=["ingestion", "retrieval", "sessions", "startup"])
+    parser.add_argument("--files", type=int, default=200, help="Synthetic markdown files to ingest")
+    parser.add_argument("--workers", type=int, default=None, help="Ingestion parser processes")
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Fake embeddings latency (s)")
+    parser.add_argument("--chat-latency", type=float, default=0.3, help="Fake chat completion latency (s)")
+    parser.add_argument("--redis-port", type=int, help="Use this running scratch redis-stack instead of starting one")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to gate regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    results = {"meta": {
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "args": vars(args),
+    }}
+    if "startup" in args.stages:
+        results["startup"] = bench_startup(list(STARTUP_BUDGETS_MS))
+        for module, entry in results["startup"].items():
+            print(f"  import {module}: {entry['import_ms']:.0f} ms")
+    # The startup stage runs alone without starting any server
+    servers = (LocalServers(args.redis_port, args.embed_latency, args.chat_latency)
+               if set(args.stages) - {"startup"} else contextlib.nullcontext())
+    with servers:
+        if "ingestion" in args.stages:
+            print(f"Ingesting {args.files} synthetic files...")
+            results["ingestion"] = bench_ingestion(args.files, args.workers)
+            print(f"  {results['ingestion']['chunks_per_s']:.1f} chunks/s")
+        if "retrieval" in args.stages:
+            results["retrieval"] = bench_retrieval(args.corpus_sizes, args.queries, args.k)
+            for entry in results["retrieval"]:
+                print(f"  corpus {entry['corpus_size']:>7}: vector p99 {entry['vector_p99_ms']:.2f} ms, "
+                      f"hybrid p99 {entry['hybrid_p99_ms']:.2f} ms")
+        if "sessions" in args.stages:
+            results["sessions"] = bench_sessions(args.concurrency, args.turns)
+            for entry in results["sessions"]:
+                print(f"  {entry['sessions']:>4} sessions: p50 {entry['p50_ms']:.0f} ms, p99 {entry['p99_ms']:.0f} ms, "
+                      f"{entry['turns_per_s']:.1f} turns/s, {entry['redis_session_bytes']:.0f} Redis bytes/session")
+
+    results["metrics"] = gated_metrics(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["metrics"]
+        found = regressions(results["metrics"], baseline, args.tolerance)
+        for entry in found:
+            print(f"REGRESSION {entry['metric']}: {entry['baseline']:.3f} -> {entry['current']:.3f} "
+                  f"({entry['change']:+.0%})")
+        if found:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
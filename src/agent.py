@@ -1,9 +1,53 @@
-from typing import Dict, List, Any, TypedDict
-from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, AIMessage
+from typing import TYPE_CHECKING, Annotated, Callable, Dict, List, Any, Optional, TypedDict
 import uuid
-from redis_ai_client import RedisAIClient
+import time
+import asyncio
+import functools
+import inspect
+import contextlib
+from redis_ai_client import RedisAIClient, AsyncRedisAIClient
+from semantic_cache import SemanticCache
+from prompt_builder import PromptBuilder
+from reranker import Reranker
+from sentiment import SentimentAnalyzer
+from scheduler import RequestScheduler, estimate_tokens
+from telemetry import telemetry
+
+# langgraph and langchain take most of a second to import; they are loaded when the agent is built
+if TYPE_CHECKING:
+    from langchain_core.messages import HumanMessage
+    from langgraph.checkpoint.base import BaseCheckpointSaver
+
+# Expected completion length, charged against the token quota before a call is made
+COMPLETION_TOKEN_ESTIMATE = 512
+
+def merge_timings(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    """Reducer that merges per-node timings written by parallel branches; an empty update (a new turn) resets them"""
+    return {**left, **right} if right else {}
+
+def timed_node(name: str, fn: Callable) -> Callable:
+    """Wrap a graph node in a node.<name> span and report its wall time in node_timings"""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state):
+            with telemetry.span(f"node.{name}") as span:
+                update = await fn(state)
+            return {**update, "node_timings": {name: span.duration}}
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        with telemetry.span(f"node.{name}") as span:
+            update = fn(state)
+        return {**update, "node_timings": {name: span.duration}}
+    return wrapper
+
+def record_llm_usage(message, span=None):
+    """Count prompt and completion tokens reported on an LLM message or stream chunk"""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        telemetry.add("llm_input_tokens", usage.get("input_tokens", 0), span)
+        telemetry.add("llm_output_tokens", usage.get("output_tokens", 0), span)
 
 # Define the state structure
 class AgentState(TypedDict):
@@ -11,85 +55,308 @@ class AgentState(TypedDict):
     user_input: str
     session_id: str
     conversation_history: List[Dict[str, Any]]
+    conversation_summary: str
     rag_context: str
+    rag_docs: List[Dict[str, Any]]
+    sentiment: str
     response: str
+    cache_hit: bool
+    node_timings: Annotated[Dict[str, float], merge_timings]
+
+class MessageStream:
+    """Iterator over response tokens; result holds the process_message-style result once exhausted"""
+
+    def __init__(self):
+        self._tokens = None
+        self.result: Optional[Dict[str, Any]] = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._tokens)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        return await self._tokens.__anext__()
 
 class RedisAILangGraphAgent:
     """LangGraph agent that integrates with RedisAI"""
     
-    def __init__(self, redis_client: RedisAIClient, openai_api_key: str):
+    def __init__(self, redis_client: RedisAIClient, openai_api_key: str,
+                 semantic_cache: Optional[SemanticCache] = None,
+                 async_redis_client: Optional[AsyncRedisAIClient] = None,
+                 prompt_token_budget: int = 4000, rag_k: int = 3, retrieval_mode: str = "hybrid",
+                 reranker: Optional[Reranker] = None,
+                 sentiment_analyzer: Optional[SentimentAnalyzer] = None, sentiment_timeout: float = 0.2,
+                 llm_scheduler: Optional[RequestScheduler] = None,
+                 checkpointer: Optional["BaseCheckpointSaver"] = None):
         self.redis_client = redis_client
-        self.llm = ChatOpenAI(
-            model="gpt-4.1-nano",
-            temperature=0.7,
-            openai_api_key=openai_api_key
-        )
+        self.async_redis_client = async_redis_client
+        self.semantic_cache = semantic_cache
+        # Retrieved chunks are packed into the prompt only as far as the budget allows
+        self.prompt_builder = PromptBuilder(prompt_token_budget)
+        self.rag_k = rag_k
+        # "hybrid" fuses BM25 full-text and vector results; "vector" is pure KNN
+        self.retrieval_mode = retrieval_mode
+        # With a reranker, retrieval over-fetches candidates and a rerank node picks the top rag_k
+        self.reranker = reranker
+        # Sentiment runs beside retrieval; a slow classifier answers "neutral" after sentiment_timeout
+        self.sentiment_analyzer = sentiment_analyzer
+        self.sentiment_timeout = sentiment_timeout
+        # LLM calls share the scheduler's concurrency cap and rate limits; it also owns 429 retries
+        self.llm_scheduler = llm_scheduler
+        # With a checkpointer, each step of a turn is saved under thread_id=session_id and an
+        # interrupted turn resumes from its last step when the same message is sent again
+        self.checkpointer = checkpointer
+        self.openai_api_key = openai_api_key
+        # Older turns are folded into a rolling summary by the same LLM, off the request path
+        for client in (redis_client, async_redis_client):
+            memory = getattr(client, "memory", None)
+            if memory is not None and memory.summarizer is None:
+                memory.summarizer = self._summarize_conversation
         
         # Create the workflow graph
-        self.workflow = self._create_workflow()
+        self.workflow = self._create_workflow({
+            "semantic_cache": self._check_semantic_cache,
+            "get_context": self._get_context,
+            "retrieve_rag_context": self._retrieve_rag_context,
+            "rerank": self._rerank,
+            "analyze_sentiment": self._analyze_sentiment,
+            "generate_response": self._generate_response,
+            "store_conversation": self._store_conversation,
+        })
+        # Streaming runs the same graph up to generation; tokens are then streamed outside the graph
+        self.stream_workflow = self._create_workflow({
+            "semantic_cache": self._check_semantic_cache,
+            "get_context": self._get_context,
+            "retrieve_rag_context": self._retrieve_rag_context,
+            "rerank": self._rerank,
+            "analyze_sentiment": self._analyze_sentiment,
+        }, streaming=True)
+        # The async graph has the same topology with coroutine nodes
+        self.async_workflow = None
+        self.async_stream_workflow = None
+        if async_redis_client is not None:
+            async_nodes = {
+                "semantic_cache": self._acheck_semantic_cache,
+                "get_context": self._aget_context,
+                "retrieve_rag_context": self._aretrieve_rag_context,
+                "rerank": self._arerank,
+                "analyze_sentiment": self._aanalyze_sentiment,
+                "generate_response": self._agenerate_response,
+                "store_conversation": self._astore_conversation,
+            }
+            self.async_workflow = self._create_workflow(async_nodes)
+            self.async_stream_workflow = self._create_workflow(async_nodes, streaming=True)
     
-    def _create_workflow(self) -> StateGraph:
-        """Create the LangGraph workflow"""
+    @functools.cached_property
+    def llm(self):
+        """Chat model, created on first use (or by warm_up)"""
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model="gpt-4.1-nano",
+            temperature=0.7,
+            openai_api_key=self.openai_api_key,
+            max_retries=0 if self.llm_scheduler is not None else 2
+        )
+
+    def warm_up(self):
+        """Load everything the first turn would otherwise wait for: pool connections, the tokenizer and the chat model"""
+        with telemetry.span("agent.warm_up"):
+            self.redis_client.warm_up()
+            self.llm
+
+    async def awarm_up(self):
+        """Async variant of warm_up, also opening connections of the async client's pool"""
+        with telemetry.span("agent.warm_up"):
+            if self.async_redis_client is not None:
+                await self.async_redis_client.warm_up()
+            # The sync pool and the model import block, so they load off the event loop
+            await asyncio.to_thread(self.redis_client.warm_up)
+            await asyncio.to_thread(lambda: self.llm)
+
+    def _create_workflow(self, nodes: Dict[str, Callable], streaming: bool = False):
+        """Create the LangGraph workflow.
+
+        History lookup, RAG retrieval and (optionally) sentiment analysis are
+        independent, so they fan out in parallel and join before
+        generate_response; with a reranker, the rerank node follows retrieval
+        on its branch. With streaming=True the graph stops after the fetch nodes;
+        otherwise the graph is compiled with the agent's checkpointer.
+        """
+        from langgraph.graph import StateGraph, START, END
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("get_context", self._get_context)
-        workflow.add_node("retrieve_rag_context", self._retrieve_rag_context)
-        workflow.add_node("generate_response", self._generate_response)
-        workflow.add_node("store_conversation", self._store_conversation)
+        fetch_nodes = ["get_context", "retrieve_rag_context"]
+        if self.sentiment_analyzer is not None:
+            fetch_nodes.append("analyze_sentiment")
+        names = list(fetch_nodes)
+        if self.reranker is not None:
+            names.append("rerank")
+        if not streaming:
+            names += ["generate_response", "store_conversation"]
+        if self.semantic_cache is not None:
+            names.insert(0, "semantic_cache")
+        for name in names:
+            workflow.add_node(name, timed_node(name, nodes[name]))
         
         # Define the flow
-        workflow.set_entry_point("get_context")
-        workflow.add_edge("get_context", "retrieve_rag_context")
-        workflow.add_edge("retrieve_rag_context", "generate_response")
-        workflow.add_edge("generate_response", "store_conversation")
-        workflow.add_edge("store_conversation", END)
+        join_nodes = fetch_nodes
+        if self.reranker is not None:
+            workflow.add_edge("retrieve_rag_context", "rerank")
+            join_nodes = [name if name != "retrieve_rag_context" else "rerank" for name in fetch_nodes]
+        finish = END if streaming else "store_conversation"
+        if self.semantic_cache is not None:
+            # A cached answer skips retrieval and generation entirely
+            workflow.add_edge(START, "semantic_cache")
+            workflow.add_conditional_edges(
+                "semantic_cache",
+                lambda state: [finish] if state["cache_hit"] else fetch_nodes,
+                [finish, *fetch_nodes]
+            )
+        else:
+            for name in fetch_nodes:
+                workflow.add_edge(START, name)
+        if streaming:
+            for name in join_nodes:
+                workflow.add_edge(name, END)
+        else:
+            workflow.add_edge(join_nodes, "generate_response")
+            workflow.add_edge("generate_response", "store_conversation")
+            workflow.add_edge("store_conversation", END)
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=None if streaming else self.checkpointer)
     
+    def _check_semantic_cache(self, state: AgentState) -> AgentState:
+        """Answer from the semantic cache when a near-duplicate question was seen before"""
+        cached = self.semantic_cache.lookup(state["user_input"])
+        telemetry.add("semantic_cache_hits" if cached is not None else "semantic_cache_misses")
+        if cached is None:
+            return {"cache_hit": False}
+        return {
+            "response": cached["answer"],
+            "cache_hit": True
+        }
     
     def _get_context(self, state: AgentState) -> AgentState:
         """Get conversation context from Redis"""
         session_id = state["session_id"]
         
-        # Get conversation history from Redis
-        conversation_history = self.redis_client.get_conversation_history(session_id, limit=5)
+        # Get recent turns and the summary of older ones from Redis
+        conversation_history, conversation_summary = self.redis_client.get_conversation_context(session_id)
         
         return {
-            **state,
-            "conversation_history": conversation_history
+            "conversation_history": conversation_history,
+            "conversation_summary": conversation_summary
         }
     
     def _retrieve_rag_context(self, state: AgentState) -> AgentState:
         """Retrieve relevant context from vector DB (RAG)"""
         user_input = state["user_input"]
-        rag_docs = self.redis_client.query_similar_documents(user_input, k=1)
+        k = self.reranker.candidates if self.reranker is not None else self.rag_k
+        if self.retrieval_mode == "hybrid":
+            rag_docs = self.redis_client.query_hybrid_documents(user_input, k=k)
+        else:
+            rag_docs = self.redis_client.query_similar_documents(user_input, k=k)
         rag_context = "\n".join([doc["text"] for doc in rag_docs]) if rag_docs else ""
         return {
-            **state,
-            "rag_context": rag_context
+            "rag_context": rag_context,
+            "rag_docs": rag_docs
         }
 
-    def _generate_response(self, state: AgentState) -> AgentState:
-        """Generate response using LLM based on context"""
-        user_input = state["user_input"]
-        conversation_history = state["conversation_history"]
-        rag_context = state.get("rag_context", "")
-        context = ""
-        if conversation_history:
-            context = "Previous conversation:\n"
-            for entry in reversed(conversation_history[:3]):
-                context += f"User: {entry['message']}\n"
-                context += f"Assistant: {entry['response']}\n"
-        if rag_context:
-            context += f"\nRelevant knowledge:\n{rag_context}\n"
+    def _rerank(self, state: AgentState) -> AgentState:
+        """Deduplicate and diversify the retrieved candidates down to rag_k"""
+        rag_docs = state["rag_docs"]
+        if len(rag_docs) > 1:
+            rag_docs = self.reranker.rerank(
+                state["user_input"],
+                self.redis_client.embed_text(state["user_input"]),  # served from the embedding cache
+                rag_docs,
+                self.redis_client.get_vectors([doc["id"] for doc in rag_docs]),
+                k=self.rag_k
+            )
+        return {
+            "rag_context": "\n".join(doc["text"] for doc in rag_docs),
+            "rag_docs": rag_docs
+        }
+
+    def _analyze_sentiment(self, state: AgentState) -> AgentState:
+        """Classify the user's sentiment with the RedisAI model (micro-batched with concurrent turns)"""
+        return {
+            "sentiment": self.sentiment_analyzer.analyze(state["user_input"], timeout=self.sentiment_timeout)
+        }
+
+    def _build_messages(self, state: AgentState) -> List["HumanMessage"]:
+        """Build the LLM prompt from history, RAG context and the user turn within the token budget"""
         system_prompt = "You are a helpful and professional assistant on serving technical documentation on RedisAI. Respond clearly and informatively."
-        messages = [
-            HumanMessage(content=f"{system_prompt}\n\n{context}\n\nUser: {user_input}")
+        sentiment = state.get("sentiment", "")
+        if sentiment == "positive":
+            system_prompt += " The user seems to be in a positive mood, so respond warmly and encouragingly."
+        elif sentiment == "negative":
+            system_prompt += " The user seems to be frustrated, so respond with understanding and get straight to a fix."
+        prompt = self.prompt_builder.build(
+            system_prompt,
+            state["user_input"],
+            history=state["conversation_history"],
+            summary=state.get("conversation_summary", ""),
+            rag_docs=state.get("rag_docs", [])
+        )
+        from langchain_core.messages import HumanMessage
+        return [
+            HumanMessage(content=prompt)
         ]
-        response = self.llm.invoke(messages)
+
+    def _summarize_conversation(self, previous_summary: str, turns: List[Dict[str, Any]]) -> str:
+        """Fold older turns (oldest first) into the rolling conversation summary"""
+        transcript = "\n".join(f"User: {turn['message']}\nAssistant: {turn['response']}" for turn in turns)
+        prompt = (
+            "Update the summary of a conversation between a user and a RedisAI documentation assistant. "
+            "Keep facts, questions and decisions that later turns may refer to, in at most 150 words.\n\n"
+            f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+        )
+        from langchain_core.messages import HumanMessage
+        return self._invoke_llm([HumanMessage(content=prompt)]).content
+
+    def _llm_tokens(self, messages: List["HumanMessage"]) -> int:
+        return estimate_tokens([message.content for message in messages]) + COMPLETION_TOKEN_ESTIMATE
+
+    def _invoke_llm(self, messages: List["HumanMessage"]):
+        with telemetry.span("llm.invoke"):
+            if self.llm_scheduler is None:
+                response = self.llm.invoke(messages)
+            else:
+                response = self.llm_scheduler.call(self.llm.invoke, messages, tokens=self._llm_tokens(messages))
+            record_llm_usage(response)
+        return response
+
+    async def _ainvoke_llm(self, messages: List["HumanMessage"]):
+        with telemetry.span("llm.invoke"):
+            if self.llm_scheduler is None:
+                response = await self.llm.ainvoke(messages)
+            else:
+                response = await self.llm_scheduler.acall(self.llm.ainvoke, messages, tokens=self._llm_tokens(messages))
+            record_llm_usage(response)
+        return response
+
+    def _llm_slot(self, messages: List["HumanMessage"]):
+        """Scheduler slot held for the duration of a streamed completion"""
+        if self.llm_scheduler is None:
+            return contextlib.nullcontext()
+        return self.llm_scheduler.slot(self._llm_tokens(messages))
+
+    def _allm_slot(self, messages: List["HumanMessage"]):
+        if self.llm_scheduler is None:
+            return contextlib.nullcontext()
+        return self.llm_scheduler.aslot(self._llm_tokens(messages))
+
+    def _generate_response(self, state: AgentState) -> AgentState:
+        """Generate response using LLM based on context"""
+        response = self._invoke_llm(self._build_messages(state))
         return {
-            **state,
             "response": response.content
         }
     
@@ -101,29 +368,225 @@ class RedisAILangGraphAgent:
         
         # Store in Redis
         self.redis_client.store_conversation(session_id, user_input, response)
+        if self.semantic_cache is not None and not state["cache_hit"]:
+            self.semantic_cache.store(user_input, response)
         
-        return state
+        return {}
     
-    def process_message(self, user_input: str, session_id: str = None) -> Dict[str, Any]:
-        """Process a user message through the workflow"""
-        if session_id is None:
-            session_id = str(uuid.uuid4())
-        
-        # Initialize state
-        initial_state = AgentState(
+    async def _acheck_semantic_cache(self, state: AgentState) -> AgentState:
+        """Async variant of _check_semantic_cache (the cache client is sync, so it runs in a thread)"""
+        return await asyncio.to_thread(self._check_semantic_cache, state)
+    
+    async def _aget_context(self, state: AgentState) -> AgentState:
+        """Get conversation context from Redis"""
+        conversation_history, conversation_summary = await self.async_redis_client.get_conversation_context(
+            state["session_id"])
+        return {
+            "conversation_history": conversation_history,
+            "conversation_summary": conversation_summary
+        }
+    
+    async def _aretrieve_rag_context(self, state: AgentState) -> AgentState:
+        """Retrieve relevant context from vector DB (RAG)"""
+        k = self.reranker.candidates if self.reranker is not None else self.rag_k
+        if self.retrieval_mode == "hybrid":
+            rag_docs = await self.async_redis_client.query_hybrid_documents(state["user_input"], k=k)
+        else:
+            rag_docs = await self.async_redis_client.query_similar_documents(state["user_input"], k=k)
+        rag_context = "\n".join([doc["text"] for doc in rag_docs]) if rag_docs else ""
+        return {
+            "rag_context": rag_context,
+            "rag_docs": rag_docs
+        }
+
+    async def _aanalyze_sentiment(self, state: AgentState) -> AgentState:
+        """Classify the user's sentiment with the RedisAI model (micro-batched with concurrent turns)"""
+        return {
+            "sentiment": await self.sentiment_analyzer.aanalyze(state["user_input"], timeout=self.sentiment_timeout)
+        }
+
+    async def _arerank(self, state: AgentState) -> AgentState:
+        """Deduplicate and diversify the retrieved candidates down to rag_k"""
+        rag_docs = state["rag_docs"]
+        if len(rag_docs) > 1:
+            query_vector, doc_vectors = await asyncio.gather(
+                self.async_redis_client.embed_text(state["user_input"]),
+                self.async_redis_client.get_vectors([doc["id"] for doc in rag_docs])
+            )
+            # Scoring is CPU-bound, so it runs off the event loop
+            rag_docs = await asyncio.to_thread(
+                self.reranker.rerank, state["user_input"], query_vector, rag_docs, doc_vectors, self.rag_k)
+        return {
+            "rag_context": "\n".join(doc["text"] for doc in rag_docs),
+            "rag_docs": rag_docs
+        }
+    
+    async def _agenerate_response(self, state: AgentState) -> AgentState:
+        """Generate response using LLM based on context"""
+        response = await self._ainvoke_llm(self._build_messages(state))
+        return {
+            "response": response.content
+        }
+    
+    async def _astore_conversation(self, state: AgentState) -> AgentState:
+        """Store conversation in Redis"""
+        await self.async_redis_client.store_conversation(state["session_id"], state["user_input"], state["response"])
+        if self.semantic_cache is not None and not state["cache_hit"]:
+            await asyncio.to_thread(self.semantic_cache.store, state["user_input"], state["response"])
+        return {}
+    
+    def scheduler_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Queue depth, batch size, in-flight and rate-limit counters for LLM and embedding calls"""
+        metrics = {}
+        if self.llm_scheduler is not None:
+            metrics["llm"] = self.llm_scheduler.metrics()
+        for name, client in (("embeddings", self.redis_client), ("async_embeddings", self.async_redis_client)):
+            client_metrics = client.embedding_metrics() if hasattr(client, "embedding_metrics") else {}
+            if client_metrics:
+                metrics[name] = client_metrics
+        return metrics
+    
+    def _initial_state(self, user_input: str, session_id: str) -> AgentState:
+        return AgentState(
             messages=[],
             user_input=user_input,
             session_id=session_id,
             conversation_history=[],
+            conversation_summary="",
             rag_context="",
-            response=""
+            rag_docs=[],
+            response="",
+            cache_hit=False,
+            sentiment="",
+            node_timings={}
         )
-        
-        # Run the workflow
-        final_state = self.workflow.invoke(initial_state)
-        
+    
+    def _graph_input(self, saved, user_input: str, session_id: str) -> Optional[AgentState]:
+        """None (resume from the checkpoint) when the session's last run is an unfinished turn with the same message"""
+        if saved is not None and saved.next and saved.values.get("user_input") == user_input:
+            telemetry.add("checkpoint_resumes")
+            return None
+        return self._initial_state(user_input, session_id)
+
+    @staticmethod
+    def _thread_config(session_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": session_id}}
+
+    def _result(self, final_state: AgentState, elapsed: float) -> Dict[str, Any]:
         return {
             "response": final_state["response"],
             "rag_context": final_state["rag_context"],
-            "session_id": session_id
-        } 
\ No newline at end of file
+            "session_id": final_state["session_id"],
+            "cache_hit": final_state["cache_hit"],
+            "sentiment": final_state["sentiment"],
+            "timings": {**final_state["node_timings"], "total": elapsed}
+        }
+    
+    def process_message(self, user_input: str, session_id: str = None) -> Dict[str, Any]:
+        """Process a user message through the workflow"""
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+        
+        # Run the workflow
+        with telemetry.span("agent.process_message") as span:
+            if self.checkpointer is None:
+                final_state = self.workflow.invoke(self._initial_state(user_input, session_id))
+            else:
+                config = self._thread_config(session_id)
+                graph_input = self._graph_input(self.workflow.get_state(config), user_input, session_id)
+                final_state = self.workflow.invoke(graph_input, config)
+        
+        return self._result(final_state, span.duration)
+    
+    async def aprocess_message(self, user_input: str, session_id: str = None) -> Dict[str, Any]:
+        """Process a user message through the async workflow"""
+        if self.async_workflow is None:
+            raise ValueError("aprocess_message requires the agent to be created with an async_redis_client")
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+        
+        with telemetry.span("agent.process_message") as span:
+            if self.checkpointer is None:
+                final_state = await self.async_workflow.ainvoke(self._initial_state(user_input, session_id))
+            else:
+                config = self._thread_config(session_id)
+                graph_input = self._graph_input(await self.async_workflow.aget_state(config), user_input, session_id)
+                final_state = await self.async_workflow.ainvoke(graph_input, config)
+        
+        return self._result(final_state, span.duration)
+    
+    def process_message_stream(self, user_input: str, session_id: str = None) -> MessageStream:
+        """Process a user message, yielding response tokens as they arrive from the LLM"""
+        stream = MessageStream()
+        stream._tokens = self._stream_tokens(user_input, session_id or str(uuid.uuid4()), stream)
+        return stream
+    
+    def _stream_tokens(self, user_input: str, session_id: str, stream: MessageStream):
+        # The root span is only made current around blocks without a yield, so it never leaks to the caller
+        root = telemetry.start_span("agent.process_message_stream")
+        start = time.perf_counter()
+        with telemetry.activate(root):
+            state = self.stream_workflow.invoke(self._initial_state(user_input, session_id))
+        timings = dict(state["node_timings"])
+        if state["cache_hit"]:
+            timings["time_to_first_token"] = time.perf_counter() - start
+            yield state["response"]
+        else:
+            generate = telemetry.start_span("node.generate_response", parent=root)
+            parts = []
+            messages = self._build_messages(state)
+            with self._llm_slot(messages):
+                for chunk in self.llm.stream(messages):
+                    # The first chunk is usually an empty role delta; time the first one with content
+                    if chunk.content and "time_to_first_token" not in timings:
+                        timings["time_to_first_token"] = time.perf_counter() - start
+                    record_llm_usage(chunk, generate)
+                    parts.append(chunk.content)
+                    yield chunk.content
+            telemetry.end_span(generate)
+            timings["generate_response"] = generate.duration
+            state = {**state, "response": "".join(parts)}
+        with telemetry.activate(root), telemetry.span("node.store_conversation") as store:
+            self._store_conversation(state)
+        timings["store_conversation"] = store.duration
+        telemetry.end_span(root)
+        stream.result = self._result({**state, "node_timings": timings}, root.duration)
+    
+    def aprocess_message_stream(self, user_input: str, session_id: str = None) -> MessageStream:
+        """Async variant of process_message_stream; iterate with async for"""
+        if self.async_stream_workflow is None:
+            raise ValueError("aprocess_message_stream requires the agent to be created with an async_redis_client")
+        stream = MessageStream()
+        stream._tokens = self._astream_tokens(user_input, session_id or str(uuid.uuid4()), stream)
+        return stream
+    
+    async def _astream_tokens(self, user_input: str, session_id: str, stream: MessageStream):
+        # The root span is only made current around blocks without a yield, so it never leaks to the caller
+        root = telemetry.start_span("agent.process_message_stream")
+        start = time.perf_counter()
+        with telemetry.activate(root):
+            state = await self.async_stream_workflow.ainvoke(self._initial_state(user_input, session_id))
+        timings = dict(state["node_timings"])
+        if state["cache_hit"]:
+            timings["time_to_first_token"] = time.perf_counter() - start
+            yield state["response"]
+        else:
+            generate = telemetry.start_span("node.generate_response", parent=root)
+            parts = []
+            messages = self._build_messages(state)
+            async with self._allm_slot(messages):
+                async for chunk in self.llm.astream(messages):
+                    # The first chunk is usually an empty role delta; time the first one with content
+                    if chunk.content and "time_to_first_token" not in timings:
+                        timings["time_to_first_token"] = time.perf_counter() - start
+                    record_llm_usage(chunk, generate)
+                    parts.append(chunk.content)
+                    yield chunk.content
+            telemetry.end_span(generate)
+            timings["generate_response"] = generate.duration
+            state = {**state, "response": "".join(parts)}
+        with telemetry.activate(root), telemetry.span("node.store_conversation") as store:
+            await self._astore_conversation(state)
+        timings["store_conversation"] = store.duration
+        telemetry.end_span(root)
+        stream.result = self._result({**state, "node_timings": timings}, root.duration)
@@ -0,0 +1,167 @@
+import json
+import time
+import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import msgpack
+import redis
+
+Turn = Dict[str, Any]
+Summarizer = Callable[[str, List[Turn]], str]
+
+# Store the summary and drop the summarized tail only while the caller still holds the summarizing lock
+COMMIT_SUMMARY_SCRIPT = """
+if redis.call('GET', KEYS[3]) ~= ARGV[1] then return 0 end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+redis.call('LTRIM', KEYS[1], 0, -(tonumber(ARGV[4]) + 1))
+return 1
+"""
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+def encode_turn(message: str, response: str) -> bytes:
+    """Pack a turn as a msgpack array instead of a JSON object with repeated keys"""
+    return msgpack.packb([message, response, int(time.time())])
+
+
+def decode_turn(item: bytes) -> Turn:
+    if item[:1] == b"{":
+        # Entry written before turns were msgpack-encoded
+        return json.loads(item.decode("utf-8"))
+    message, response, timestamp = msgpack.unpackb(item)
+    return {"message": message, "response": response, "timestamp": timestamp}
+
+
+class ConversationMemory:
+    """Bounded per-session conversation memory with a rolling summary.
+
+    Turns live newest-first in conversation:{session_id}, capped at max_turns.
+    Once more than window + summarize_batch turns accumulate, the turns older
+    than the window are folded into conversation:{session_id}:summary by the
+    summarizer, off the request path, and removed from the list. Only one
+    process summarizes a session at a time: it holds
+    conversation:{session_id}:summarizing (expiring after lock_ttl seconds),
+    and the summary is committed only if that lock is still held.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis], max_turns: int = 20, window: int = 3,
+                 summarize_batch: int = 4, ttl: int = 3600, summarizer: Optional[Summarizer] = None,
+                 lock_ttl: int = 120):
+        self.redis_client = redis_client
+        # Leave headroom so turns pushed during a summarization are not trimmed unsummarized
+        self.max_turns = max(max_turns, window + 2 * summarize_batch)
+        self.window = window
+        self.summarize_batch = summarize_batch
+        self.ttl = ttl
+        self.summarizer = summarizer
+        self.lock_ttl = lock_ttl
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+        self._pending = set()
+        self._tasks = set()
+
+    @staticmethod
+    def _keys(session_id: str) -> Tuple[str, str]:
+        return f"conversation:{session_id}", f"conversation:{session_id}:summary"
+
+    @staticmethod
+    def _lock_key(session_id: str) -> str:
+        return f"conversation:{session_id}:summarizing"
+
+    def _store_pipeline(self, pipe, session_id: str, message: str, response: str):
+        turns_key, summary_key = self._keys(session_id)
+        pipe.lpush(turns_key, encode_turn(message, response))
+        pipe.ltrim(turns_key, 0, self.max_turns - 1)
+        pipe.expire(turns_key, self.ttl)
+        pipe.expire(summary_key, self.ttl)
+        return pipe
+
+    def _load_pipeline(self, pipe, session_id: str, limit: int):
+        turns_key, summary_key = self._keys(session_id)
+        pipe.lrange(turns_key, 0, limit - 1)
+        pipe.get(summary_key)
+        return pipe
+
+    def _older_pipeline(self, pipe, session_id: str):
+        turns_key, summary_key = self._keys(session_id)
+        pipe.lrange(turns_key, self.window, -1)
+        pipe.get(summary_key)
+        return pipe
+
+    def _needs_summary(self, session_id: str, length: int) -> bool:
+        return (self.summarizer is not None and length > self.window + self.summarize_batch
+                and session_id not in self._pending)
+
+    def store(self, session_id: str, message: str, response: str):
+        """Push, trim and expire in one round trip; schedules summarization when the list grows"""
+        length = self._store_pipeline(self.redis_client.pipeline(), session_id, message, response).execute()[0]
+        if self._needs_summary(session_id, length):
+            self._pending.add(session_id)
+            self._executor.submit(self._summarize, session_id)
+
+    def load(self, session_id: str, limit: Optional[int] = None) -> Tuple[List[Turn], str]:
+        """Recent turns (newest first) and the rolling summary, in one round trip"""
+        turns, summary = self._load_pipeline(self.redis_client.pipeline(), session_id, limit or self.window).execute()
+        return [decode_turn(item) for item in turns], (summary or b"").decode("utf-8")
+
+    def _summarize(self, session_id: str):
+        lock_key, token = self._lock_key(session_id), uuid.uuid4().hex
+        try:
+            # Another worker may be summarizing the same session
+            if not self.redis_client.set(lock_key, token, nx=True, ex=self.lock_ttl):
+                return
+            try:
+                older, summary = self._older_pipeline(self.redis_client.pipeline(), session_id).execute()
+                if older:
+                    summary = self.summarizer((summary or b"").decode("utf-8"),
+                                              [decode_turn(item) for item in reversed(older)])
+                    self.redis_client.eval(*self._commit_summary_args(session_id, token, summary, len(older)))
+            finally:
+                self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            print(f"Error summarizing conversation {session_id}: {e}")
+        finally:
+            self._pending.discard(session_id)
+
+    def _commit_summary_args(self, session_id: str, token: str, summary: str, summarized: int) -> tuple:
+        # Only the summarized tail is dropped; turns pushed meanwhile stay at the head
+        turns_key, summary_key = self._keys(session_id)
+        return (COMMIT_SUMMARY_SCRIPT, 3, turns_key, summary_key, self._lock_key(session_id),
+                token, summary, self.ttl, summarized)
+
+    async def astore(self, async_redis_client, session_id: str, message: str, response: str):
+        """Async variant of store over a redis.asyncio client"""
+        length = (await self._store_pipeline(async_redis_client.pipeline(), session_id, message, response).execute())[0]
+        if self._needs_summary(session_id, length):
+            self._pending.add(session_id)
+            task = asyncio.get_running_loop().create_task(self._asummarize(async_redis_client, session_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def aload(self, async_redis_client, session_id: str, limit: Optional[int] = None) -> Tuple[List[Turn], str]:
+        """Async variant of load over a redis.asyncio client"""
+        turns, summary = await self._load_pipeline(async_redis_client.pipeline(), session_id,
+                                                   limit or self.window).execute()
+        return [decode_turn(item) for item in turns], (summary or b"").decode("utf-8")
+
+    async def _asummarize(self, async_redis_client, session_id: str):
+        lock_key, token = self._lock_key(session_id), uuid.uuid4().hex
+        try:
+            if not await async_redis_client.set(lock_key, token, nx=True, ex=self.lock_ttl):
+                return
+            try:
+                older, summary = await self._older_pipeline(async_redis_client.pipeline(), session_id).execute()
+                if older:
+                    summary = await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self.summarizer, (summary or b"").decode("utf-8"),
+                        [decode_turn(item) for item in reversed(older)])
+                    await async_redis_client.eval(*self._commit_summary_args(session_id, token, summary, len(older)))
+            finally:
+                await async_redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            print(f"Error summarizing conversation {session_id}: {e}")
+        finally:
+            self._pending.discard(session_id)
@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+import redis
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys: trim and collapse whitespace"""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: in-process LRU backed by Redis.
+
+    Vectors are keyed by model name and a hash of the normalized text, and
+    stored in Redis as raw float32 bytes with a TTL.
+    """
+
+    def __init__(self, redis_client: redis.Redis, model: str, max_entries: int = 10000,
+                 ttl: int = 7 * 24 * 3600, prefix: str = "embcache"):
+        self.redis_client = redis_client
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{self.model}:{digest}"
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self.evictions += 1
+
+    def _lookup_local(self, texts: List[str]):
+        """Serve texts from the LRU; returns partial results and the keys to fetch from Redis"""
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        remote: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self.key(text)
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    results[i] = vector
+                    self.hits += 1
+                else:
+                    remote.setdefault(key, []).append(i)
+        return results, remote
+
+    def _fill_remote(self, results, remote, values):
+        for (key, positions), value in zip(remote.items(), values):
+            if value is None:
+                self.misses += len(positions)
+                continue
+            vector = np.frombuffer(value, dtype=np.float32)
+            self._remember(key, vector)
+            self.redis_hits += len(positions)
+            for i in positions:
+                results[i] = vector
+        return results
+
+    def _prepare_put(self, texts: List[str], vectors: List[list], pipe):
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            vector = np.asarray(vector, dtype=np.float32)
+            self._remember(key, vector)
+            pipe.set(key, vector.tobytes(), ex=self.ttl)
+        return pipe
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up texts in the LRU, then fetch the remainder from Redis with one MGET"""
+        results, remote = self._lookup_local(texts)
+        if not remote:
+            return results
+        try:
+            values = self.redis_client.mget(list(remote))
+        except redis.RedisError as e:
+            print(f"Error reading embedding cache: {e}")
+            values = [None] * len(remote)
+        return self._fill_remote(results, remote, values)
+
+    def put_many(self, texts: List[str], vectors: List[list]):
+        """Store vectors in the LRU and in Redis with one pipelined round trip"""
+        pipe = self._prepare_put(texts, vectors, self.redis_client.pipeline(transaction=False))
+        try:
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error writing embedding cache: {e}")
+
+    async def aget_many(self, async_redis_client, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Async variant of get_many over a redis.asyncio client"""
+        results, remote = self._lookup_local(texts)
+        if not remote:
+            return results
+        try:
+            values = await async_redis_client.mget(list(remote))
+        except redis.RedisError as e:
+            print(f"Error reading embedding cache: {e}")
+            values = [None] * len(remote)
+        return self._fill_remote(results, remote, values)
+
+    async def aput_many(self, async_redis_client, texts: List[str], vectors: List[list]):
+        """Async variant of put_many over a redis.asyncio client"""
+        pipe = self._prepare_put(texts, vectors, async_redis_client.pipeline(transaction=False))
+        try:
+            await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error writing embedding cache: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._lru),
+        }
@@ -1,57 +1,227 @@
 import os
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dotenv import load_dotenv
 from redis_ai_client import RedisAIClient
-import markdown
-from bs4 import BeautifulSoup
-from tiktoken import get_encoding
-
-def md_to_text(md_path):
-    with open(md_path, "r", encoding="utf-8") as f:
-        html = markdown.markdown(f.read())
-        text = BeautifulSoup(html, features="html.parser").get_text()
-    return text
-
-def chunk_text(text, max_tokens=3000, overlap=100, encoding_name='cl100k_base'):
-    enc = get_encoding(encoding_name)
-    tokens = enc.encode(text)
-    
-    chunks = []
-    start = 0
-    while start < len(tokens):
-        end = min(start + max_tokens, len(tokens))
-        chunk = enc.decode(tokens[start:end])
-        chunks.append(chunk)
-        start += max_tokens - overlap
-    return chunks
+from semantic_cache import SemanticCache
+from retrieval_backends import NumpyVectorBackend
+from local_embeddings import DEFAULT_MODEL, create_embedder
+from redis_connections import DEFAULT_REDISAI_PORT
+from markdown_chunker import CHUNKER_VERSION, DEFAULT_CHUNK_TOKENS, chunk_markdown
+
+def parse_file(file_path, known_hash=None, chunk_tokens=DEFAULT_CHUNK_TOKENS):
+    """Hash, parse and chunk a single markdown file (runs in a worker process).
+
+    Returns (filename, content_hash, chunks, error); chunks are (text, token_count,
+    section) tuples, or None when the content hash matches known_hash and the file
+    does not need re-embedding.
+    """
+    filename = os.path.basename(file_path)
+    try:
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        content_hash = hashlib.sha256(raw).hexdigest()
+        if content_hash == known_hash:
+            return filename, content_hash, None, None
+        return filename, content_hash, chunk_markdown(raw.decode("utf-8"), chunk_tokens), None
+    except Exception as e:
+        return filename, None, [], str(e)
 
 # Use an absolute path for the commands directory
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 # COMMANDS_DIR = os.path.join(REPO_ROOT, 'redis-inference-optimization', 'docs')
 COMMANDS_DIR = os.path.join(REPO_ROOT, 'redis-doc', 'commands')
 
-client = RedisAIClient()
-client.create_vector_index()
-
-total = 0
-success = 0
-fail = 0
-
-for filename in os.listdir(COMMANDS_DIR):
-    if filename.endswith('.md'):
-        print(filename)
-        total += 1
-        file_path = os.path.join(COMMANDS_DIR, filename)
-        print(f"[INFO] Processing {file_path}")
-        try:
-            md_text = md_to_text(file_path)
-            doc_id = filename.replace('.md', '')
-            chunks = chunk_text(md_text)
-            for i, chunk in enumerate(chunks):
-                embedding = client.embed_text(chunk)
-                client.store_document_with_embedding(i, chunk, embedding)
-            print(f"[SUCCESS] Ingested {doc_id}")
-            success += 1
-        except Exception as e:
-            print(f"[ERROR] Failed to ingest {filename}: {e}")
-            fail += 1
-
-print(f"\n[SUMMARY] Processed: {total}, Success: {success}, Failed: {fail}")
\ No newline at end of file
+class IngestStats:
+    """Counters for the ingestion throughput report"""
+
+    def __init__(self):
+        self.files = 0
+        self.success = 0
+        self.fail = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.stale_keys = 0
+        self.chunks = 0
+        self.embed_calls = 0
+        self.redis_round_trips = 0
+        self.corpus_changed = False
+        self.start = time.perf_counter()
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        print(f"\n[SUMMARY] Processed: {self.files}, Success: {self.success}, Failed: {self.fail}, "
+              f"Unchanged: {self.unchanged}, Removed: {self.removed}, Stale keys deleted: {self.stale_keys}")
+        print(f"[THROUGHPUT] {elapsed:.2f}s elapsed, "
+              f"{self.files / elapsed:.1f} files/s, {self.chunks / elapsed:.1f} chunks/s")
+        print(f"[THROUGHPUT] Embed calls: {self.embed_calls}, Redis round trips: {self.redis_round_trips}")
+
+class IngestPipeline:
+    """Parse on a process pool, embed in batches, write with large Redis pipelines"""
+
+    def __init__(self, client: RedisAIClient, embed_batch_size: int = 64, redis_batch_size: int = 500,
+                 workers: int = None, embed_concurrency: int = 4, full: bool = False,
+                 index_name: str = "rag_docs", chunk_tokens: int = DEFAULT_CHUNK_TOKENS):
+        self.client = client
+        self.chunk_tokens = chunk_tokens
+        # Recorded per file; files chunked with other settings count as changed
+        self.chunker = f"markdown-v{CHUNKER_VERSION}:{chunk_tokens}"
+        self.full = full
+        self.index_name = index_name
+        self.embed_batch_size = embed_batch_size
+        self.redis_batch_size = redis_batch_size
+        self.workers = workers
+        self.embed_concurrency = embed_concurrency
+        self.stats = IngestStats()
+
+    def _embed_batch(self, batch):
+        embeddings = self.client.embed_texts([doc["text"] for doc in batch])
+        for doc, embedding in zip(batch, embeddings):
+            doc["embedding"] = embedding
+        return batch
+
+    def _flush(self, pending, write_buffer, wait_all=False):
+        """Collect finished embedding batches and write them once the Redis buffer is full"""
+        while pending and (wait_all or len(pending) >= self.embed_concurrency or pending[0].done()):
+            write_buffer.extend(pending.pop(0).result())
+            self.stats.embed_calls += 1
+        if len(write_buffer) >= self.redis_batch_size or (wait_all and write_buffer):
+            self.stats.redis_round_trips += self.client.store_documents_with_embeddings(
+                write_buffer, index_name=self.index_name, batch_size=self.redis_batch_size)
+            write_buffer.clear()
+
+    def run(self, commands_dir: str = COMMANDS_DIR):
+        manifest = self.client.get_ingest_manifest(self.index_name)
+        self.stats.redis_round_trips += 1
+        on_disk = {filename: os.path.join(commands_dir, filename)
+                   for filename in sorted(os.listdir(commands_dir)) if filename.endswith('.md')}
+
+        # Files whose mtime and chunker settings are unchanged are skipped without being read
+        paths, known_hashes, mtimes = [], [], {}
+        for filename, path in on_disk.items():
+            mtimes[filename] = os.stat(path).st_mtime
+            entry = manifest.get(filename)
+            if self.full or (entry and entry.get("chunker") != self.chunker):
+                entry = None
+            if entry and entry["mtime"] == mtimes[filename]:
+                self.stats.unchanged += 1
+                continue
+            paths.append(path)
+            known_hashes.append(entry["hash"] if entry else None)
+
+        updates, stale_keys = {}, []
+        embed_batch, write_buffer, pending = [], [], []
+        with ProcessPoolExecutor(max_workers=self.workers) as parsers, \
+                ThreadPoolExecutor(max_workers=self.embed_concurrency) as embedders:
+            for filename, content_hash, chunks, error in parsers.map(
+                    parse_file, paths, known_hashes, [self.chunk_tokens] * len(paths), chunksize=8):
+                self.stats.files += 1
+                if error:
+                    print(f"[ERROR] Failed to ingest {filename}: {error}")
+                    self.stats.fail += 1
+                    continue
+                old_keys = manifest.get(filename, {}).get("chunks", [])
+                if chunks is None:
+                    # Touched but not modified: only the mtime needs refreshing
+                    updates[filename] = {"mtime": mtimes[filename], "hash": content_hash, "chunks": old_keys,
+                                         "chunker": self.chunker}
+                    self.stats.unchanged += 1
+                    continue
+                doc_id = filename[:-len('.md')]
+                new_keys = []
+                for i, (chunk, tokens, section) in enumerate(chunks):
+                    new_keys.append(f"{self.index_name}:{doc_id}:{i}")
+                    embed_batch.append({"doc_id": f"{doc_id}:{i}", "text": chunk, "tokens": tokens,
+                                        "source": doc_id, "section": section})
+                    if len(embed_batch) >= self.embed_batch_size:
+                        pending.append(embedders.submit(self._embed_batch, embed_batch))
+                        embed_batch = []
+                        self._flush(pending, write_buffer)
+                stale_keys.extend(set(old_keys) - set(new_keys))
+                updates[filename] = {"mtime": mtimes[filename], "hash": content_hash, "chunks": new_keys,
+                                     "chunker": self.chunker}
+                self.stats.chunks += len(chunks)
+                self.stats.success += 1
+            if embed_batch:
+                pending.append(embedders.submit(self._embed_batch, embed_batch))
+            self._flush(pending, write_buffer, wait_all=True)
+
+        # Chunks are written before the manifest, so an interrupted run is simply redone next time
+        removed = [filename for filename in manifest if filename not in on_disk]
+        for filename in removed:
+            stale_keys.extend(manifest[filename]["chunks"])
+        if self.full or not manifest:
+            # Chunks no manifest entry lists, e.g. rag_docs:<i> keys from before per-document keys
+            listed = {key for filename, entry in {**manifest, **updates}.items() if filename not in removed
+                      for key in entry["chunks"]}
+            stale_keys.extend(set(self.client.document_keys(self.index_name)) - listed - set(stale_keys))
+        self.client.update_ingest_manifest(updates, removed, stale_keys, self.index_name)
+        self.stats.redis_round_trips += 1
+        self.stats.removed = len(removed)
+        self.stats.stale_keys = len(stale_keys)
+        self.stats.corpus_changed = self.stats.success > 0 or bool(removed)
+        return self.stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Redis command docs into the vector index")
+    parser.add_argument("--commands-dir", default=COMMANDS_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="Chunks per embeddings API call")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="Embedding calls in flight")
+    parser.add_argument("--redis-batch-size", type=int, default=500, help="Commands per Redis pipeline")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS,
+                        help="Target tokens per chunk; chunks never cross a heading")
+    parser.add_argument("--full", action="store_true", help="Re-embed every file, ignoring the manifest")
+    parser.add_argument("--embedding-dim", type=int, default=1536, help="Embedding dimension (<= 1536)")
+    parser.add_argument("--vector-type", choices=["FLOAT32", "FLOAT16", "INT8"], default="FLOAT32",
+                        help="Stored vector precision; FLOAT16 and INT8 are rescored against the float32 query")
+    parser.add_argument("--algorithm", choices=["FLAT", "HNSW"], default="FLAT")
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-runtime", type=int, default=10)
+    parser.add_argument("--backend", choices=["redis", "numpy"], default="redis",
+                        help="Where chunks and vectors are stored")
+    parser.add_argument("--numpy-path", default="numpy_index", help="Directory for the numpy backend")
+    parser.add_argument("--embedder", choices=["openai", "redisai", "torch"], default="openai",
+                        help="Embed with the OpenAI API, a TorchScript model in RedisAI, or the same model in process")
+    parser.add_argument("--embedder-model", help="TorchScript file (loaded into RedisAI if not stored yet)")
+    parser.add_argument("--tokenizer", default=DEFAULT_MODEL, help="Tokenizer of the local embedding model")
+    parser.add_argument("--migrate-to", metavar="INDEX",
+                        help="Build INDEX with the given index options over the existing documents, "
+                             "swap the rag_docs alias to it and exit")
+    args = parser.parse_args()
+    load_dotenv()
+
+    embedder = create_embedder(args.embedder, args.embedder_model, args.tokenizer,
+                               ai_host=os.getenv("REDISAI_HOST", "localhost"),
+                               ai_port=int(os.getenv("REDISAI_PORT", DEFAULT_REDISAI_PORT)))
+    # A local model fixes the vector dimension
+    embedding_dim = embedder.dim if embedder else args.embedding_dim
+    retrieval_backend = None
+    if args.backend == "numpy":
+        retrieval_backend = NumpyVectorBackend(args.numpy_path, dim=embedding_dim)
+    client = RedisAIClient(embedding_dim=embedding_dim, vector_type=args.vector_type,
+                           retrieval_backend=retrieval_backend, embedder=embedder)
+    index_options = dict(algorithm=args.algorithm, m=args.hnsw_m, ef_construction=args.ef_construction,
+                         ef_runtime=args.ef_runtime)
+    if args.migrate_to:
+        client.migrate_vector_index("rag_docs", args.migrate_to, **index_options)
+        print(f"[SUCCESS] rag_docs now points at {args.migrate_to}")
+        return
+    if args.backend == "redis":
+        client.create_vector_index(**index_options)
+
+    pipeline = IngestPipeline(client, embed_batch_size=args.embed_batch_size,
+                              redis_batch_size=args.redis_batch_size, workers=args.workers,
+                              embed_concurrency=args.embed_concurrency, full=args.full,
+                              chunk_tokens=args.chunk_tokens)
+    stats = pipeline.run(args.commands_dir)
+    if stats.corpus_changed:
+        # Cached answers may be based on documents that just changed
+        SemanticCache(client.redis_client, client.embed_text).invalidate()
+    stats.report()
+
+if __name__ == "__main__":
+    main()
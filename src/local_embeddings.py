@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Local sentence-embedding models served through RedisAI or in-process torch
+
+Export a Hugging Face sentence-embedding model to TorchScript (mean pooling
+and L2 normalization are baked into the graph) and store it in RedisAI:
+
+    python local_embeddings.py --model sentence-transformers/all-MiniLM-L6-v2 --out models/minilm.pt --store
+"""
+
+import os
+import argparse
+import threading
+from typing import List, Optional
+import numpy as np
+import redis
+from redis_connections import DEFAULT_REDISAI_PORT, get_redis_client
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_MODEL_KEY = "embedder:minilm"
+DEFAULT_MODEL_DIM = 384
+
+
+def export_torchscript(model_name: str, out_path: str, max_length: int = 128) -> str:
+    """Trace model_name into a TorchScript module mapping (input_ids, attention_mask) to unit vectors"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    class MeanPoolingEncoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            hidden = self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+            mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            return torch.nn.functional.normalize(pooled, dim=1)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    encoder = MeanPoolingEncoder(AutoModel.from_pretrained(model_name, torchscript=True).eval())
+    example = tokenizer(["a short example", "another example sentence"], padding="max_length",
+                        truncation=True, max_length=max_length, return_tensors="pt")
+    with torch.inference_mode():
+        traced = torch.jit.trace(encoder, (example["input_ids"], example["attention_mask"]))
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    traced.save(out_path)
+    return out_path
+
+
+class LocalEmbedder:
+    """Embeds texts with a TorchScript sentence encoder; subclasses decide where the model runs.
+
+    Texts are tokenized on the client, sorted by length so each batch pads to a
+    similar size, and run in batches of batch_size.
+    """
+
+    def __init__(self, tokenizer_name: str = DEFAULT_MODEL, dim: int = DEFAULT_MODEL_DIM,
+                 max_length: int = 128, batch_size: int = 32):
+        self.tokenizer_name = tokenizer_name
+        self.dim = dim
+        self.max_length = max_length
+        self.batch_size = batch_size
+        # Embedding cache namespace, kept apart from OpenAI vectors of the same dimension
+        self.model_name = f"local:{tokenizer_name}"
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _tokenize(self, texts: List[str]):
+        with self._lock:
+            if self._tokenizer is None:
+                from transformers import AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+        encoded = self._tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                  return_tensors="np")
+        return encoded["input_ids"].astype(np.int64), encoded["attention_mask"].astype(np.int64)
+
+    def _run(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed(self, texts: List[str]) -> List[list]:
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            vectors[batch] = self._run(*self._tokenize([texts[i] for i in batch]))
+        return vectors.tolist()
+
+
+class RedisAIEmbedder(LocalEmbedder):
+    """Runs the TorchScript encoder inside RedisAI with one AI.DAGEXECUTE per batch"""
+
+    def __init__(self, ai_client: redis.Redis, model_key: str = DEFAULT_MODEL_KEY, device: str = "CPU", **kwargs):
+        super().__init__(**kwargs)
+        self.ai_client = ai_client
+        self.model_key = model_key
+        self.device = device
+
+    def model_exists(self) -> bool:
+        try:
+            self.ai_client.execute_command("AI.MODELGET", self.model_key, "META")
+            return True
+        except redis.ResponseError:
+            return False
+
+    def store_model(self, model_path: str):
+        """AI.MODELSTORE the TorchScript file; RedisAI may batch concurrent runs up to batch_size rows"""
+        with open(model_path, "rb") as f:
+            blob = f.read()
+        self.ai_client.execute_command(
+            "AI.MODELSTORE", self.model_key, "TORCH", self.device,
+            "BATCHSIZE", self.batch_size, "BLOB", blob)
+
+    def _run(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        rows, length = input_ids.shape
+        # Tensors live only inside the DAG, so nothing is written to the keyspace
+        reply = self.ai_client.execute_command(
+            "AI.DAGEXECUTE", "ROUTING", self.model_key,
+            "|>", "AI.TENSORSET", "input_ids", "INT64", rows, length, "BLOB", input_ids.tobytes(),
+            "|>", "AI.TENSORSET", "attention_mask", "INT64", rows, length, "BLOB", attention_mask.tobytes(),
+            "|>", "AI.MODELEXECUTE", self.model_key, "INPUTS", 2, "input_ids", "attention_mask", "OUTPUTS", 1, "embeddings",
+            "|>", "AI.TENSORGET", "embeddings", "BLOB")
+        return np.frombuffer(reply[-1], dtype=np.float32).reshape(rows, self.dim)
+
+
+class TorchEmbedder(LocalEmbedder):
+    """Runs the TorchScript encoder in process on CPU"""
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        import torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self._model = torch.jit.load(model_path, map_location="cpu").eval()
+
+    def _run(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        import torch
+        with torch.inference_mode():
+            return self._model(torch.from_numpy(input_ids), torch.from_numpy(attention_mask)).numpy()
+
+
+def create_embedder(kind: str, model_path: Optional[str] = None, tokenizer_name: str = DEFAULT_MODEL,
+                    dim: int = DEFAULT_MODEL_DIM, ai_host: str = "localhost",
+                    ai_port: int = DEFAULT_REDISAI_PORT) -> Optional[LocalEmbedder]:
+    """Embedder for kind "redisai" or "torch"; None for "openai" (remote embeddings API)"""
+    if kind == "openai":
+        return None
+    if kind == "torch":
+        return TorchEmbedder(model_path, tokenizer_name=tokenizer_name, dim=dim)
+    if kind == "redisai":
+        embedder = RedisAIEmbedder(get_redis_client(host=ai_host, port=ai_port), tokenizer_name=tokenizer_name, dim=dim)
+        if not embedder.model_exists():
+            if not model_path:
+                raise ValueError(f"RedisAI model {embedder.model_key} is not loaded and no model path was given")
+            embedder.store_model(model_path)
+        return embedder
+    raise ValueError(f"Unknown embedder: {kind}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Hugging Face sentence-embedding model")
+    parser.add_argument("--out", default=os.path.join("models", "minilm.pt"), help="TorchScript output path")
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--store", action="store_true", help="Also AI.MODELSTORE the model into RedisAI")
+    parser.add_argument("--model-key", default=DEFAULT_MODEL_KEY)
+    parser.add_argument("--ai-host", default=os.getenv("REDISAI_HOST", "localhost"))
+    parser.add_argument("--ai-port", type=int, default=int(os.getenv("REDISAI_PORT", DEFAULT_REDISAI_PORT)))
+    args = parser.parse_args()
+
+    path = export_torchscript(args.model, args.out, args.max_length)
+    print(f"Exported {args.model} to {path}")
+    if args.store:
+        embedder = RedisAIEmbedder(get_redis_client(host=args.ai_host, port=args.ai_port), model_key=args.model_key,
+                                   tokenizer_name=args.model)
+        embedder.store_model(path)
+        print(f"Stored as RedisAI model {args.model_key}")
+
+
+if __name__ == "__main__":
+    main()
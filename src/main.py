@@ -8,14 +8,22 @@ A simple demonstration of integrating RedisAI with LangGraph agents.
 import os
 import sys
 from dotenv import load_dotenv
-from redis_ai_client import RedisAIClient
+from redis_ai_client import AsyncRedisAIClient, RedisAIClient
 from agent import RedisAILangGraphAgent
+from semantic_cache import SemanticCache
+from retrieval_backends import NumpyVectorBackend
+from reranker import CrossEncoderScorer, Reranker
+from local_embeddings import DEFAULT_MODEL, create_embedder
+from sentiment import SentimentAnalyzer
+from scheduler import RequestScheduler
+from redis_connections import DEFAULT_REDISAI_PORT, get_redis_client, pool_stats
+from telemetry import OTLPHttpExporter, telemetry
 
 def check_redis_connection():
     """Check if Redis is running and accessible"""
     try:
-        redis_client = RedisAIClient()
-        redis_client.redis_client.ping()
+        # Uses the shared pool, so this connection is reused by the clients created next
+        get_redis_client().ping()
         print("✅ Redis connection successful")
         return True
     except Exception as e:
@@ -24,6 +32,120 @@ def check_redis_connection():
         print("docker run -d --name redis-ai -p 6379:6379 redislabs/redisai:latest")
         return False
 
+def configure_telemetry(serve_metrics: bool = True):
+    """Export spans to OTLP_ENDPOINT and serve Prometheus metrics on METRICS_PORT when they are set.
+
+    Server workers pass serve_metrics=False: they share the port setting and serve /metrics themselves.
+    """
+    if os.getenv("OTLP_ENDPOINT"):
+        telemetry.exporter = OTLPHttpExporter(os.getenv("OTLP_ENDPOINT"))
+    if serve_metrics and os.getenv("METRICS_PORT"):
+        telemetry.serve_prometheus(int(os.getenv("METRICS_PORT")))
+        print(f"📈 Prometheus metrics on :{os.getenv('METRICS_PORT')}/metrics")
+
+def create_scheduler(prefix, requests_per_minute, tokens_per_minute):
+    """Rate limits and concurrency cap for one provider quota, read from {prefix}_RPM, {prefix}_TPM and {prefix}_MAX_CONCURRENT"""
+    return RequestScheduler(
+        max_concurrent=int(os.getenv(f"{prefix}_MAX_CONCURRENT", "16")),
+        requests_per_minute=float(os.getenv(f"{prefix}_RPM", requests_per_minute)),
+        tokens_per_minute=float(os.getenv(f"{prefix}_TPM", tokens_per_minute))
+    )
+
+def create_redis_client():
+    """Create the RedisAI client with the embedder, vector shape and retrieval backend configured in the environment"""
+    embedder = create_embedder(
+        os.getenv("EMBEDDER", "openai"),
+        os.getenv("EMBEDDER_MODEL_PATH"),
+        os.getenv("EMBEDDER_TOKENIZER", DEFAULT_MODEL),
+        ai_host=os.getenv("REDISAI_HOST", "localhost"),
+        ai_port=int(os.getenv("REDISAI_PORT", DEFAULT_REDISAI_PORT))
+    )
+    # A local model fixes the vector dimension
+    embedding_dim = embedder.dim if embedder else int(os.getenv("EMBEDDING_DIM", "1536"))
+    retrieval_backend = None
+    if os.getenv("RETRIEVAL_BACKEND", "redis") == "numpy":
+        retrieval_backend = NumpyVectorBackend(os.getenv("NUMPY_INDEX_PATH", "numpy_index"), dim=embedding_dim)
+    return RedisAIClient(
+        embedding_dim=embedding_dim,
+        vector_type=os.getenv("VECTOR_TYPE", "FLOAT32"),
+        retrieval_backend=retrieval_backend,
+        embedder=embedder,
+        scheduler=create_scheduler("EMBED", "3000", "1000000"),
+        rescore_oversample=int(os.getenv("RESCORE_OVERSAMPLE", "4"))
+    )
+
+def create_async_client(redis_client):
+    """Create an asyncio client sharing the sync client's embedding cache, memory settings, embedder, scheduler
+    and retrieval backend"""
+    return AsyncRedisAIClient(
+        embedding_cache=redis_client.embedding_cache,
+        embedding_dim=redis_client.embedding_dim,
+        vector_type=redis_client.vector_type,
+        memory=redis_client.memory,
+        embedder=redis_client.embedder,
+        scheduler=redis_client.scheduler,
+        rescore_oversample=int(os.getenv("RESCORE_OVERSAMPLE", "4")),
+        retrieval_backend=redis_client.retrieval_backend
+    )
+
+def create_reranker():
+    """Create the rerank stage selected by RERANK (none, mmr or cross-encoder)"""
+    mode = os.getenv("RERANK", "none")
+    if mode == "none":
+        return None
+    return Reranker(
+        candidates=int(os.getenv("RERANK_CANDIDATES", "10")),
+        cross_encoder=CrossEncoderScorer() if mode == "cross-encoder" else None,
+        budget=float(os.getenv("RERANK_BUDGET_MS", "250")) / 1000
+    )
+
+def create_sentiment_analyzer():
+    """Create the RedisAI sentiment classifier when SENTIMENT is enabled"""
+    if os.getenv("SENTIMENT", "false").lower() not in ("1", "true", "yes"):
+        return None
+    analyzer = SentimentAnalyzer(get_redis_client(
+        host=os.getenv("REDISAI_HOST", "localhost"),
+        port=int(os.getenv("REDISAI_PORT", DEFAULT_REDISAI_PORT))
+    ))
+    if not analyzer.model_exists():
+        analyzer.store_model(os.getenv("SENTIMENT_MODEL_PATH", os.path.join("models", "sentiment.pt")))
+    return analyzer
+
+def create_agent(redis_client, openai_api_key, async_redis_client=None):
+    """Create the agent, with the semantic response cache when SEMANTIC_CACHE is enabled
+    and Redis graph checkpoints when CHECKPOINTS is enabled"""
+    semantic_cache = None
+    if os.getenv("SEMANTIC_CACHE", "false").lower() in ("1", "true", "yes"):
+        semantic_cache = SemanticCache(
+            redis_client.redis_client,
+            redis_client.embed_text,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            ttl=int(os.getenv("SEMANTIC_CACHE_TTL", "86400")),
+            dim=redis_client.embedding_dim
+        )
+    checkpointer = None
+    if os.getenv("CHECKPOINTS", "false").lower() in ("1", "true", "yes"):
+        # Imported here: langgraph's checkpoint module is slow to load and most runs don't need it
+        from redis_checkpointer import RedisCheckpointSaver
+        checkpointer = RedisCheckpointSaver(
+            redis_client.redis_client,
+            async_redis_client.redis_client if async_redis_client else None,
+            ttl=int(os.getenv("CHECKPOINT_TTL", "3600"))
+        )
+    return RedisAILangGraphAgent(
+        redis_client,
+        openai_api_key,
+        async_redis_client=async_redis_client,
+        semantic_cache=semantic_cache,
+        checkpointer=checkpointer,
+        prompt_token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "4000")),
+        retrieval_mode=os.getenv("RETRIEVAL_MODE", "hybrid"),
+        reranker=create_reranker(),
+        sentiment_analyzer=create_sentiment_analyzer(),
+        sentiment_timeout=float(os.getenv("SENTIMENT_TIMEOUT_MS", "200")) / 1000,
+        llm_scheduler=create_scheduler("LLM", "500", "200000")
+    )
+
 def main():
     """Main demo function"""
     print("🚀 RedisAI + LangGraph Agent Demo")
@@ -31,6 +153,7 @@ def main():
     
     # Load environment variables
     load_dotenv()
+    configure_telemetry()
     
     # Check OpenAI API key
     openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -46,11 +169,15 @@ def main():
     
     # Initialize RedisAI client
     print("🔧 Initializing RedisAI client...")
-    redis_client = RedisAIClient()
+    redis_client = create_redis_client()
     
     # Initialize LangGraph agent
     print("🤖 Initializing LangGraph agent...")
-    agent = RedisAILangGraphAgent(redis_client, openai_api_key)
+    agent = create_agent(redis_client, openai_api_key)
+    
+    # Open pool connections and load the tokenizer and chat model now rather than on the first question
+    print("🔥 Warming up...")
+    agent.warm_up()
     
     print("\n✅ Setup complete! Starting interactive chat...")
     print("Type 'quit' to exit")
@@ -71,18 +198,30 @@ def main():
             if not user_input:
                 continue
             
-            # Process message through agent
+            # Process message through agent, rendering tokens as they arrive
             print("🤔 Processing...")
-            result = agent.process_message(user_input, session_id)
+            stream = agent.process_message_stream(user_input, session_id)
+            print("🤖 Assistant: ", end="", flush=True)
+            for token in stream:
+                print(token, end="", flush=True)
+            print()
+            result = stream.result
             
             # Update session ID for conversation continuity
             session_id = result["session_id"]
             
+            if result["cache_hit"]:
+                print("⚡ Answered from semantic cache")
+            
+            if result["sentiment"]:
+                print(f"🙂 Sentiment: {result['sentiment']}")
+            
             # Display RAG context used
             print(f"📚 RAG Context: {result['rag_context']}")
             
-            # Display response
-            print(f"🤖 Assistant: {result['response']}")
+            # Display per-node latency breakdown
+            timings = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in result["timings"].items())
+            print(f"⏱️ Timings: {timings}")
             
         except KeyboardInterrupt:
             print("\n👋 Goodbye!")
@@ -90,6 +229,9 @@ def main():
         except Exception as e:
             print(f"❌ Error: {e}")
             print("Please try again.")
+    
+    # Send spans still waiting for a full export batch
+    telemetry.flush()
 
 def demo_workflow():
     """Demonstrate the workflow with predefined messages"""
@@ -98,6 +240,7 @@ def demo_workflow():
     
     # Load environment variables
     load_dotenv()
+    configure_telemetry()
     openai_api_key = os.getenv("OPENAI_API_KEY")
     
     if not openai_api_key:
@@ -105,8 +248,8 @@ def demo_workflow():
         return
     
     # Initialize components
-    redis_client = RedisAIClient()
-    agent = RedisAILangGraphAgent(redis_client, openai_api_key)
+    redis_client = create_redis_client()
+    agent = create_agent(redis_client, openai_api_key)
     
     # Demo messages
     demo_messages = [
@@ -127,6 +270,12 @@ def demo_workflow():
         
         print(f"🤖 Assistant: {result['response']}")
     
+    if agent.semantic_cache is not None:
+        print(f"\n🗄️ Semantic cache: {agent.semantic_cache.stats()}")
+    print(f"📊 Scheduler: {agent.scheduler_metrics()}")
+    print(f"🔌 Redis pool: {pool_stats(redis_client.redis_client.connection_pool)}")
+    print(f"⏱️ Latency by span: {telemetry.summary()}")
+    telemetry.flush()
     print("\n✅ Demo workflow completed!")
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+import re
+import itertools
+from typing import Iterable, Iterator, List, Tuple
+from prompt_builder import DEFAULT_ENCODING, get_encoder
+
+DEFAULT_CHUNK_TOKENS = 512
+# Bump when chunk boundaries or text change, so incremental ingests re-chunk every file
+CHUNKER_VERSION = 2
+HEADING_SEPARATOR = " > "
+# "\n\n" between blocks of a chunk is a single cl100k token
+BLOCK_SEPARATOR_TOKENS = 1
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+FENCE = re.compile(r"^\s*(`{3,}|~{3,})")
+THEMATIC_BREAK = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+SETEXT_UNDERLINE = re.compile(r"^\s*(=+|-+)\s*$")
+FRONT_MATTER_TITLE = re.compile(r"^title:\s*['\"]?(.*?)['\"]?\s*$")
+
+CODE_SPAN = re.compile(r"`([^`]*)`")
+CODE_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+# Inline markup rewritten to its visible text, in order; code spans are set aside first
+INLINE_RULES = [
+    (re.compile(r"<!--.*?-->", re.S), ""),
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),
+    (re.compile(r"\[([^\]]+)\]\[[^\]]*\]"), r"\1"),
+    (re.compile(r"</?[A-Za-z][^>]*>"), ""),
+    (re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1"), r"\2"),
+    (re.compile(r"(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])"), r"\1"),
+    (re.compile(r"(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)"), r"\1"),
+    (re.compile(r"^ {0,3}>\s?", re.M), ""),
+    (re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+", re.M), "- "),
+]
+
+
+def strip_inline(text: str) -> str:
+    """Plain text of a markdown paragraph (links, emphasis, inline code and HTML tags removed)"""
+    # Code spans are kept verbatim, so placeholders such as `<key>` are not taken for tags or emphasis
+    spans = []
+
+    def set_aside(match):
+        spans.append(match.group(1))
+        return f"\x00{len(spans) - 1}\x00"
+
+    text = CODE_SPAN.sub(set_aside, text)
+    for pattern, replacement in INLINE_RULES:
+        text = pattern.sub(replacement, text)
+    return CODE_PLACEHOLDER.sub(lambda match: spans[int(match.group(1))], text).strip()
+
+
+def markdown_blocks(lines: Iterable[str]) -> Iterator[Tuple[Tuple[str, ...], str]]:
+    """Stream (heading_path, text) blocks from markdown lines in one pass.
+
+    A block is a paragraph, list or table converted to plain text, or the
+    verbatim body of a fenced code block. heading_path holds the enclosing
+    headings, outermost first; the title of YAML front matter, if present,
+    is the outermost heading.
+    """
+    path: List[Tuple[int, str]] = []
+    paragraph: List[str] = []
+    lines = iter(lines)
+
+    def enter(level: int, title: str):
+        while path and path[-1][0] >= level:
+            path.pop()
+        path.append((level, strip_inline(title)))
+
+    def flush():
+        text = strip_inline("\n".join(paragraph))
+        paragraph.clear()
+        return tuple(title for _, title in path), text
+
+    first = next(lines, None)
+    if first is not None and first.strip() == "---":
+        for line in lines:
+            if line.strip() in ("---", "..."):
+                break
+            title = FRONT_MATTER_TITLE.match(line)
+            if title:
+                enter(0, title.group(1))
+    elif first is not None:
+        lines = itertools.chain([first], lines)
+
+    for line in lines:
+        line = line.rstrip("\n")
+        if len(paragraph) == 1 and SETEXT_UNDERLINE.match(line):
+            enter(1 if "=" in line else 2, paragraph.pop())
+            continue
+        fence = FENCE.match(line)
+        heading = None if fence else HEADING.match(line)
+        if not (fence or heading or not line.strip() or THEMATIC_BREAK.match(line)):
+            paragraph.append(line)
+            continue
+        if paragraph:
+            yield flush()
+        if heading:
+            enter(len(heading.group(1)), heading.group(2))
+        elif fence:
+            code = []
+            for code_line in lines:
+                if code_line.strip().startswith(fence.group(1)):
+                    break
+                code.append(code_line.rstrip("\n"))
+            if code:
+                yield tuple(title for _, title in path), "\n".join(code)
+    if paragraph:
+        yield flush()
+
+
+def _split_block(text: str, tokens: List[int], max_tokens: int, enc) -> Iterator[Tuple[str, int]]:
+    """Pieces of an oversized block: whole lines where possible, token windows for longer lines"""
+    lines = text.split("\n")
+    if len(lines) == 1:
+        for start in range(0, len(tokens), max_tokens):
+            window = tokens[start:start + max_tokens]
+            yield enc.decode(window), len(window)
+        return
+    for line in lines:
+        line_tokens = enc.encode(line)
+        if len(line_tokens) > max_tokens:
+            yield from _split_block(line, line_tokens, max_tokens, enc)
+        elif line_tokens:
+            yield line, len(line_tokens)
+
+
+def chunk_markdown(md: str, max_tokens: int = DEFAULT_CHUNK_TOKENS,
+                   encoding_name: str = DEFAULT_ENCODING) -> List[Tuple[str, int, str]]:
+    """Split markdown into (text, token_count, section) chunks of at most about max_tokens tokens.
+
+    Chunks never cross a heading: consecutive blocks of one section are packed
+    together, and a block larger than the budget is split at line boundaries.
+    section is the heading path (e.g. "SET > Options"), which also prefixes the
+    chunk text so each chunk reads on its own. Every block is tokenized once and
+    chunk counts are summed from the pieces, so they can differ by a token or two
+    from encoding the joined text.
+    """
+    enc = get_encoder(encoding_name)
+    chunks = []
+    current_path, section, header, header_tokens = None, "", "", 0
+    parts, used = [], 0
+
+    def emit():
+        if parts:
+            chunks.append((header + "\n\n".join(parts), used, section))
+
+    for path, text in markdown_blocks(md.splitlines()):
+        if not text:
+            continue
+        if path != current_path:
+            emit()
+            current_path = path
+            section = HEADING_SEPARATOR.join(path)
+            header = section + "\n\n" if section else ""
+            header_tokens = len(enc.encode(header)) if header else 0
+            parts, used = [], header_tokens
+        tokens = enc.encode(text)
+        budget = max(max_tokens - header_tokens, 1)
+        pieces = [(text, len(tokens))] if len(tokens) <= budget else _split_block(text, tokens, budget, enc)
+        for piece, count in pieces:
+            if parts and used + BLOCK_SEPARATOR_TOKENS + count > max_tokens:
+                emit()
+                parts, used = [], header_tokens
+            used += count + (BLOCK_SEPARATOR_TOKENS if parts else 0)
+            parts.append(piece)
+    emit()
+    return chunks
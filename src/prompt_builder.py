@@ -0,0 +1,85 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from tiktoken import get_encoding
+
+DEFAULT_ENCODING = "cl100k_base"
+# Section headings and separators added around the packed pieces
+HEADER_TOKENS = 24
+
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding_name: str = DEFAULT_ENCODING):
+    """tiktoken encoder, loaded once per process"""
+    return get_encoding(encoding_name)
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    return len(get_encoder(encoding_name).encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, encoding_name: str = DEFAULT_ENCODING) -> str:
+    """Cut text to at most max_tokens tokens"""
+    enc = get_encoder(encoding_name)
+    tokens = enc.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max(max_tokens, 0)])
+
+
+class PromptBuilder:
+    """Assembles the LLM prompt within a fixed token budget.
+
+    The system prompt and the user turn are always included (the user turn is
+    truncated if it alone exceeds the budget). The remaining budget is filled
+    greedily by priority: RAG chunks in rank order, then conversation turns
+    newest first, then the summary of earlier turns. Anything that does not
+    fit is dropped; only the best RAG chunk is truncated to fit rather than
+    dropped. Chunks carrying a "tokens" count from ingest are not re-encoded.
+    """
+
+    def __init__(self, max_tokens: int = 4000, encoding_name: str = DEFAULT_ENCODING):
+        self.max_tokens = max_tokens
+        self.encoding_name = encoding_name
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.encoding_name)
+
+    def build(self, system_prompt: str, user_input: str, history: Optional[List[Dict[str, Any]]] = None,
+              summary: str = "", rag_docs: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Prompt text for one turn; history is newest first, rag_docs best first"""
+        user_turn = f"User: {user_input}"
+        remaining = self.max_tokens - self.count(system_prompt) - self.count(user_turn) - HEADER_TOKENS
+        if remaining < 0:
+            user_turn = truncate_tokens(user_turn, self.count(user_turn) + remaining, self.encoding_name)
+            remaining = 0
+
+        knowledge = []
+        for doc in rag_docs or []:
+            tokens = doc.get("tokens") or self.count(doc["text"])
+            if tokens <= remaining:
+                knowledge.append(doc["text"])
+                remaining -= tokens
+            elif not knowledge and remaining > 0:
+                knowledge.append(truncate_tokens(doc["text"], remaining, self.encoding_name))
+                remaining = 0
+
+        turns = []
+        for entry in history or []:
+            turn = f"User: {entry['message']}\nAssistant: {entry['response']}\n"
+            tokens = self.count(turn)
+            if tokens > remaining:
+                break
+            turns.append(turn)
+            remaining -= tokens
+
+        if summary and self.count(summary) > remaining:
+            summary = ""
+
+        context = ""
+        if summary:
+            context = f"Summary of earlier conversation:\n{summary}\n\n"
+        if turns:
+            context += "Previous conversation:\n" + "".join(reversed(turns))
+        if knowledge:
+            context += "\nRelevant knowledge:\n" + "\n".join(knowledge) + "\n"
+        return f"{system_prompt}\n\n{context}\n\n{user_turn}"
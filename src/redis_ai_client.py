@@ -2,89 +2,861 @@ import redis
 import numpy as np
 import json
 import os
-from typing import List, Dict, Any
-from openai import OpenAI
-from dotenv import load_dotenv
+import re
+import asyncio
+import time
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+from embedding_cache import EmbeddingCache
+from semantic_cache import escape_tag
+from retrieval_backends import RetrievalBackend
+from conversation_memory import ConversationMemory
+from local_embeddings import LocalEmbedder
+from scheduler import AsyncMicroBatcher, MicroBatcher, RequestScheduler, estimate_tokens
+from redis_connections import awarm_pool, create_async_redis_client, get_redis_client, reply_map, search_hits, warm_pool
+from prompt_builder import get_encoder
+from telemetry import instrument, telemetry
 
-load_dotenv()
+EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_EMBEDDING_DIM = 1536
+VECTOR_DTYPES = {"FLOAT32": np.float32, "FLOAT16": np.float16, "INT8": np.int8}
+# Coarse KNN candidates per result when compressed vectors are rescored against the float32 query
+DEFAULT_RESCORE_OVERSAMPLE = 4
+# Maximum number of inputs the embeddings API accepts per request
+EMBED_REQUEST_LIMIT = 2048
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Pool connections opened by warm_up before the first request
+DEFAULT_WARM_CONNECTIONS = 4
 
+@lru_cache(maxsize=None)
+def get_openai_client():
+    """OpenAI client shared by the process, created on first use.
+
+    Importing openai is a large share of startup time, and processes that embed
+    with a local model or only read from Redis never need it.
+    """
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def vector_field_name(dim: int, vector_type: str) -> str:
+    """Hash field holding vectors of the given shape; the default shape keeps the original 'embedding' field"""
+    if dim == DEFAULT_EMBEDDING_DIM and vector_type == "FLOAT32":
+        return "embedding"
+    return f"embedding_{vector_type.lower()}_{dim}"
+
+def vector_field_shape(vector_field: str) -> Tuple[int, str]:
+    """(dim, vector_type) of a field named by vector_field_name"""
+    if vector_field == "embedding":
+        return DEFAULT_EMBEDDING_DIM, "FLOAT32"
+    _, vector_type, dim = vector_field.split("_")
+    return int(dim), vector_type.upper()
+
+def index_vector_field(info) -> str:
+    """Hash field behind the VECTOR attribute of an FT.INFO reply (RESP2 or RESP3)"""
+    for attribute in reply_map(info)[b"attributes"]:
+        if isinstance(attribute, dict):
+            if attribute.get(b"type") == b"VECTOR":
+                return attribute[b"identifier"].decode()
+        elif b"VECTOR" in attribute:
+            return attribute[attribute.index(b"identifier") + 1].decode()
+    raise ValueError("Index has no VECTOR attribute")
+
+def scale_field_name(vector_field: str) -> str:
+    """Hash field holding the per-vector scale of an INT8 vector field"""
+    return f"{vector_field}_scale"
+
+def prepare_vector(embedding, dim: int) -> np.ndarray:
+    """Float32 embedding of the given dim, truncated and renormalized when a smaller dim is requested.
+
+    text-embedding-3 vectors are trained so that a renormalized prefix is itself a valid embedding.
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    if vector.shape[0] > dim:
+        vector = vector[:dim]
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+    return vector
+
+def int8_scale(vector: np.ndarray) -> float:
+    """Symmetric scalar quantization step: the largest component maps to +/-127"""
+    return max(float(np.abs(vector).max()), 1e-12) / 127
+
+def encode_vector(embedding, dim: int, vector_type: str) -> bytes:
+    """Encode an embedding for storage or as a query vector of the given shape.
+
+    INT8 vectors are quantized with their own scale (see int8_scale), which
+    cosine distance ignores; store it with scale_field_name to reconstruct
+    the vector.
+    """
+    vector = prepare_vector(embedding, dim)
+    if vector_type == "INT8":
+        return np.clip(np.rint(vector / int8_scale(vector)), -127, 127).astype(np.int8).tobytes()
+    return vector.astype(VECTOR_DTYPES[vector_type]).tobytes()
+
+def decode_vectors(values: List[Optional[bytes]], dim: int, vector_type: str,
+                   scales: Optional[List[Optional[bytes]]] = None) -> np.ndarray:
+    """Stack stored vectors into a float32 matrix, dequantized by scales when given; missing vectors become zero rows"""
+    vectors = np.zeros((len(values), dim), dtype=np.float32)
+    for i, value in enumerate(values):
+        if value is not None:
+            vectors[i] = np.frombuffer(value, dtype=VECTOR_DTYPES[vector_type])
+            if scales is not None and scales[i] is not None:
+                vectors[i] *= float(scales[i])
+    return vectors
+
+def queue_vector_reads(pipe, keys: List[str], vector_field: str):
+    for key in keys:
+        pipe.hmget(key, vector_field, scale_field_name(vector_field))
+
+def decode_vector_reads(replies: list, dim: int, vector_type: str) -> np.ndarray:
+    """Vectors from the [vector, scale] replies queued by queue_vector_reads"""
+    return decode_vectors([reply[0] for reply in replies], dim, vector_type, [reply[1] for reply in replies])
+
+def tag_filter(tags: Optional[Dict[str, List[str]]]) -> str:
+    """RediSearch pre-filter matching any of the given values in each TAG field, e.g. {"source": ["ai.tensorset"]}"""
+    if not tags:
+        return ""
+    return " ".join(f"@{field}:{{{'|'.join(escape_tag(value) for value in values)}}}"
+                    for field, values in tags.items())
+
+def knn_search_args(query_vec: bytes, k: int, index_name: str, ef_runtime: Optional[int] = None,
+                    tags: Optional[Dict[str, List[str]]] = None, fields: Tuple[str, ...] = ("text", "score", "tokens")) -> tuple:
+    """FT.SEARCH arguments for a top-k vector similarity query returning fields, optionally pre-filtered by tags"""
+    ef = f" EF_RUNTIME {ef_runtime}" if ef_runtime else ""
+    prefilter = f"({tag_filter(tags)})" if tags else "*"
+    return ("FT.SEARCH", index_name,
+            f"{prefilter}=>[KNN {k} @embedding $vec{ef} as score]",
+            "PARAMS", "2", "vec", query_vec,
+            "SORTBY", "score", "ASC",
+            "RETURN", str(len(fields)), *fields,
+            "DIALECT", "2",
+            "LIMIT", "0", str(k))
+
+def rescore_search_args(query_vec: bytes, k: int, index_name: str, vector_field: str,
+                        ef_runtime: Optional[int] = None) -> tuple:
+    """Coarse KNN FT.SEARCH arguments returning the stored vectors and scales instead of the chunk text"""
+    return knn_search_args(query_vec, k, index_name, ef_runtime,
+                           fields=("score", "tokens", vector_field, scale_field_name(vector_field)))
+
+def text_search_args(query: str, k: int, index_name: str, tags: Optional[Dict[str, List[str]]] = None) -> Optional[tuple]:
+    """FT.SEARCH arguments for a BM25 full-text query over the chunk text, or None if the query has no terms.
+
+    Terms are split on punctuation the way RediSearch tokenizes indexed text, so
+    a command name such as AI.TENSORSET matches its "ai" and "tensorset" tokens.
+    """
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    return ("FT.SEARCH", index_name,
+            f"{tag_filter(tags)} @text:({'|'.join(terms)})".strip(),
+            "SCORER", "BM25",
+            "RETURN", "2", "text", "tokens",
+            "DIALECT", "2",
+            "LIMIT", "0", str(k))
+
+def _result_doc(key: bytes, score: float, fields: Dict[bytes, bytes]) -> Dict[str, Any]:
+    # float() and int() accept bytes directly; only the key and text need decoding
+    tokens = fields.get(b"tokens")
+    return {"id": key.decode(), "score": score, "text": fields[b"text"].decode(),
+            "tokens": int(tokens) if tokens is not None else None}
+
+def parse_knn_result(result) -> list:
+    """Convert a KNN FT.SEARCH reply into [{"id", "score", "text", "tokens"}]; tokens is None for chunks stored without a count"""
+    return [_result_doc(key, float(fields[b"score"]), fields) for key, fields in search_hits(result)]
+
+def reciprocal_rank_fusion(replies: list, k: int, rrf_k: int = 60) -> list:
+    """Fuse FT.SEARCH replies (best first) by reciprocal rank; score is the fused RRF score, higher is better"""
+    scores, fields = {}, {}
+    for reply in replies:
+        for rank, (key, doc) in enumerate(search_hits(reply), 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            fields.setdefault(key, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [_result_doc(key, scores[key], fields[key]) for key in best]
+
+def rescore_knn_result(result, embedding, k: int, dim: int, vector_type: str, vector_field: str) -> list:
+    """Re-rank coarse KNN hits by exact cosine distance between the float32 query and the stored vectors.
+
+    Returns the top k as [{"id", "score", "text", "tokens"}] with text None; see fetch_texts.
+    """
+    hits = search_hits(result)
+    if not hits:
+        return []
+    field, scale = vector_field.encode(), scale_field_name(vector_field).encode()
+    vectors = decode_vectors([fields.get(field) for _, fields in hits], dim, vector_type,
+                             [fields.get(scale) for _, fields in hits])
+    query = prepare_vector(embedding, dim)
+    norms = np.maximum(np.linalg.norm(vectors, axis=1), 1e-12) * max(float(np.linalg.norm(query)), 1e-12)
+    distances = 1.0 - (vectors @ query) / norms
+    results = []
+    for i in np.argsort(distances, kind="stable")[:k]:
+        tokens = hits[i][1].get(b"tokens")
+        results.append({"id": hits[i][0].decode(), "score": float(distances[i]), "text": None,
+                        "tokens": int(tokens) if tokens is not None else None})
+    return results
+
+def parse_rescored_replies(replies, embeddings: List[list], k: int, dim: int, vector_type: str,
+                           vector_field: str) -> List[list]:
+    """rescore_knn_result for pipelined coarse KNN replies in query order; a failed search yields []"""
+    results = []
+    for reply, embedding in zip(replies, embeddings):
+        if isinstance(reply, Exception):
+            print(f"Error querying similar documents: {reply}")
+            results.append([])
+        else:
+            results.append(rescore_knn_result(reply, embedding, k, dim, vector_type, vector_field))
+    return results
+
+def queue_text_reads(pipe, results: List[list]):
+    for docs in results:
+        for doc in docs:
+            pipe.hget(doc["id"], "text")
+
+def fill_texts(results: List[list], texts: list) -> List[list]:
+    """Set each result's text from the replies queued by queue_text_reads"""
+    texts = iter(texts)
+    for docs in results:
+        for doc in docs:
+            text = next(texts)
+            doc["text"] = text.decode() if text is not None else ""
+    return results
+
+def parse_knn_replies(replies) -> List[list]:
+    """Parse pipelined KNN FT.SEARCH replies in order; a failed search yields []"""
+    results = []
+    for reply in replies:
+        if isinstance(reply, Exception):
+            print(f"Error querying similar documents: {reply}")
+            results.append([])
+        else:
+            results.append(parse_knn_result(reply))
+    return results
+
+def record_cache_lookups(total: int, missing: int):
+    telemetry.add("embedding_cache_hits", total - missing)
+    telemetry.add("embedding_cache_misses", missing)
+
+def record_embedding_usage(resp, texts: List[str]):
+    """Count billed embedding tokens, estimated when the response carries no usage"""
+    usage = getattr(resp, "usage", None)
+    telemetry.add("embedding_tokens", usage.total_tokens if usage is not None else estimate_tokens(texts))
+
+def embedding_model_key(embedding_dim: int) -> str:
+    """Model name used for embedding cache keys"""
+    if embedding_dim == DEFAULT_EMBEDDING_DIM:
+        return EMBEDDING_MODEL
+    return f"{EMBEDDING_MODEL}:{embedding_dim}"
+
+def embedding_request_args(texts: List[str], embedding_dim: int) -> Dict[str, Any]:
+    """Keyword arguments for an OpenAI embeddings request"""
+    args = {"input": texts, "model": EMBEDDING_MODEL}
+    if embedding_dim != DEFAULT_EMBEDDING_DIM:
+        args["dimensions"] = embedding_dim
+    return args
+
+def queue_hybrid_search(pipe, query: str, query_vec: bytes, index_name: str,
+                        tags: Optional[Dict[str, List[str]]], ef_runtime: Optional[int], candidates: int) -> int:
+    """Queue the BM25 and KNN searches for one query on a pipeline; returns how many were queued"""
+    queued = 1
+    text_args = text_search_args(query, candidates, index_name, tags)
+    if text_args:
+        pipe.execute_command(*text_args)
+        queued += 1
+    pipe.execute_command(*knn_search_args(query_vec, candidates, index_name, ef_runtime, tags))
+    return queued
+
+def fuse_hybrid_replies(replies: list, counts: List[int], k: int) -> List[list]:
+    """Split pipelined hybrid replies per query and fuse each group; failed searches are skipped"""
+    results, start = [], 0
+    for count in counts:
+        ranked = []
+        for reply in replies[start:start + count]:
+            if isinstance(reply, Exception):
+                print(f"Error querying similar documents: {reply}")
+            else:
+                ranked.append(reply)
+        results.append(reciprocal_rank_fusion(ranked, k))
+        start += count
+    return results
+
+class RedisVectorBackend(RetrievalBackend):
+    """Retrieval backend over Redis hashes and a RediSearch vector index.
+
+    With compressed vectors (FLOAT16 or INT8) and rescore_oversample > 1, a
+    vector search is two-stage: a coarse KNN for k * rescore_oversample
+    candidates returns only their stored vectors, which are re-ranked by exact
+    cosine distance to the float32 query; the chunk text is then read for the
+    final k only.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis_client: redis.Redis, embedding_dim: int = DEFAULT_EMBEDDING_DIM,
+                 vector_type: str = "FLOAT32", rescore_oversample: int = DEFAULT_RESCORE_OVERSAMPLE):
+        self.redis_client = redis_client
+        self.embedding_dim = embedding_dim
+        self.vector_type = vector_type
+        self.vector_field = vector_field_name(embedding_dim, vector_type)
+        self.rescore_oversample = rescore_oversample if vector_type != "FLOAT32" else 1
+
+    def add(self, docs: List[Dict[str, Any]], index_name: str = "rag_docs", batch_size: int = 500) -> int:
+        """Store many documents in pipelined batches. Returns the number of Redis round trips."""
+        round_trips = 0
+        pipe = self.redis_client.pipeline(transaction=False)
+        for n, doc in enumerate(docs, 1):
+            mapping = {
+                "text": doc["text"],
+                self.vector_field: encode_vector(doc["embedding"], self.embedding_dim, self.vector_type)
+            }
+            if self.vector_type == "INT8":
+                mapping[scale_field_name(self.vector_field)] = int8_scale(
+                    prepare_vector(doc["embedding"], self.embedding_dim))
+            if doc.get("tokens") is not None:
+                mapping["tokens"] = doc["tokens"]
+            if doc.get("source"):
+                mapping["source"] = doc["source"]
+            if doc.get("section"):
+                mapping["section"] = doc["section"]
+            pipe.hset(f"{index_name}:{doc['doc_id']}", mapping=mapping)
+            if n % batch_size == 0:
+                pipe.execute()
+                round_trips += 1
+        if len(pipe):
+            pipe.execute()
+            round_trips += 1
+        return round_trips
+
+    def delete(self, keys: List[str]):
+        if keys:
+            self.redis_client.delete(*keys)
+
+    def keys(self, index_name: str = "rag_docs") -> List[str]:
+        return [key.decode("utf-8") for key in
+                self.redis_client.scan_iter(match=f"{index_name}:*", count=1000, _type="HASH")]
+
+    def get_vectors(self, keys: List[str]) -> np.ndarray:
+        pipe = self.redis_client.pipeline(transaction=False)
+        queue_vector_reads(pipe, keys, self.vector_field)
+        return decode_vector_reads(pipe.execute(), self.embedding_dim, self.vector_type)
+
+    def search_batch(self, embeddings: List[list], k: int = 3, index_name: str = "rag_docs",
+                     ef_runtime: Optional[int] = None, batch_size: int = 500) -> List[list]:
+        """Send the KNN searches in pipelines of batch_size, one round trip per batch (two when rescoring)"""
+        results = []
+        for start in range(0, len(embeddings), batch_size):
+            batch = embeddings[start:start + batch_size]
+            pipe = self.redis_client.pipeline(transaction=False)
+            for embedding in batch:
+                query_vec = encode_vector(embedding, self.embedding_dim, self.vector_type)
+                if self.rescore_oversample > 1:
+                    pipe.execute_command(*rescore_search_args(
+                        query_vec, k * self.rescore_oversample, index_name, self.vector_field, ef_runtime))
+                else:
+                    pipe.execute_command(*knn_search_args(query_vec, k, index_name, ef_runtime))
+            try:
+                replies = pipe.execute(raise_on_error=False)
+                if self.rescore_oversample > 1:
+                    found = parse_rescored_replies(replies, batch, k, self.embedding_dim, self.vector_type,
+                                                   self.vector_field)
+                    queue_text_reads(pipe, found)
+                    results.extend(fill_texts(found, pipe.execute() if len(pipe) else []))
+                else:
+                    results.extend(parse_knn_replies(replies))
+            except redis.RedisError as e:
+                print(f"Error querying similar documents: {e}")
+                results.extend([] for _ in batch)
+        return results
+
+    def hybrid_search_batch(self, queries: List[str], embeddings: List[list], k: int = 3,
+                            index_name: str = "rag_docs", tags: Optional[Dict[str, List[str]]] = None,
+                            ef_runtime: Optional[int] = None, candidates: int = 20) -> List[list]:
+        """Run the BM25 and KNN queries for every query in one pipeline and fuse each pair with RRF"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        counts = [queue_hybrid_search(pipe, query, encode_vector(embedding, self.embedding_dim, self.vector_type),
+                                      index_name, tags, ef_runtime, candidates)
+                  for query, embedding in zip(queries, embeddings)]
+        try:
+            return fuse_hybrid_replies(pipe.execute(raise_on_error=False), counts, k)
+        except redis.RedisError as e:
+            print(f"Error querying similar documents: {e}")
+            return [[] for _ in queries]
+
+@instrument
 class RedisAIClient:
-    """Wrapper for RedisAI operations"""
+    """Wrapper for RedisAI operations
 
-    def __init__(self, host='localhost', port=6379, db=0):
-        self.redis_client = redis.Redis(host=host, port=port, db=db)
-        self.ai_client = redis.Redis(host=host, port=port, db=db)
+    embedding_dim and vector_type select the shape of stored vectors; anything
+    other than 1536-dim FLOAT32 is stored in its own hash field (see vector_field_name).
+    FLOAT16 and INT8 vectors are searched in two stages, oversampling by
+    rescore_oversample (see RedisVectorBackend).
+    Document storage and vector search go through retrieval_backend, which
+    defaults to the Redis vector index. With an embedder (see local_embeddings),
+    embeddings are computed by a local model instead of the OpenAI API; its
+    dim must equal embedding_dim. With a scheduler, cache misses from
+    concurrent callers are coalesced into batched calls that are rate
+    limited and retried by the scheduler.
 
-    def store_conversation(self, session_id: str, message: str, response: str):
-        """Store conversation data in Redis"""
-        conversation_data = {
-            'message': message,
-            'response': response,
-            'timestamp': str(np.datetime64('now'))
-        }
+    Connections come from the process-wide pool for host, port and db (REDIS_*
+    environment settings when not given; see redis_connections), so every
+    client in the process shares the same sockets. Public methods are traced
+    as spans (see telemetry).
+    """
+
+    def __init__(self, host=None, port=None, db=None, embedding_dim: int = DEFAULT_EMBEDDING_DIM,
+                 vector_type: str = "FLOAT32", retrieval_backend: Optional[RetrievalBackend] = None,
+                 embedder: Optional[LocalEmbedder] = None, scheduler: Optional[RequestScheduler] = None,
+                 rescore_oversample: int = DEFAULT_RESCORE_OVERSAMPLE):
+        self.redis_client = get_redis_client(host=host, port=port, db=db)
+        self.ai_client = self.redis_client
+        self.embedding_dim = embedding_dim
+        self.vector_type = vector_type
+        self.vector_field = vector_field_name(embedding_dim, vector_type)
+        self.embedder = embedder
+        self.embedding_cache = EmbeddingCache(
+            self.redis_client, embedder.model_name if embedder else embedding_model_key(embedding_dim))
+        if retrieval_backend is None:
+            retrieval_backend = RedisVectorBackend(self.redis_client, embedding_dim, vector_type, rescore_oversample)
+        self.retrieval_backend = retrieval_backend
+        self.memory = ConversationMemory(self.redis_client)
+        self.scheduler = scheduler
+        self.embed_batcher = None
+        if scheduler is not None:
+            self.embed_batcher = MicroBatcher(
+                lambda batch: scheduler.call(self._embed_uncached, batch, tokens=estimate_tokens(batch)),
+                max_concurrent=scheduler.max_concurrent)
+
+    def warm_up(self, connections: int = DEFAULT_WARM_CONNECTIONS) -> int:
+        """Pre-open pool connections and load the tokenizer and OpenAI client, so the first request pays for none of them.
 
-        # Store in Redis as JSON
-        self.redis_client.lpush(f"conversation:{session_id}", json.dumps(conversation_data))
-        self.redis_client.expire(f"conversation:{session_id}", 3600)  # Expire in 1 hour
+        Returns the number of connections opened or checked.
+        """
+        opened = warm_pool(self.redis_client.connection_pool, connections)
+        get_encoder()
+        if self.embedder is None:
+            get_openai_client()
+        return opened
+
+    def store_conversation(self, session_id: str, message: str, response: str):
+        """Store conversation data in Redis (bounded list, rolling summary of older turns)"""
+        self.memory.store(session_id, message, response)
 
     def get_conversation_history(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Retrieve conversation history from Redis"""
+        return self.get_conversation_context(session_id, limit)[0]
+
+    def get_conversation_context(self, session_id: str, limit: int = None) -> Tuple[List[Dict[str, Any]], str]:
+        """Retrieve recent turns (newest first) and the rolling summary of older turns"""
         try:
-            history = self.redis_client.lrange(f"conversation:{session_id}", 0, limit - 1)
-            return [json.loads(item.decode('utf-8')) for item in history]
+            return self.memory.load(session_id, limit)
         except Exception as e:
             print(f"Error retrieving conversation history: {e}")
-            return [] 
+            return [], ""
 
     def store_document_with_embedding(self, doc_id: str, text: str, embedding: list, index_name: str = "rag_docs"):
-        """Store a document and its embedding in Redis for vector search (RAG)."""
-        # Store as a Redis hash with vector field
-        pipe = self.redis_client.pipeline()
-        pipe.hset(f"{index_name}:{doc_id}", mapping={
-            "text": text,
-            "embedding": np.array(embedding, dtype=np.float32).tobytes()
-        })
-        pipe.execute()
-
-    def create_vector_index(self, index_name: str = "rag_docs", dim: int = 1536):
-        """Create a Redis vector index for RAG if it doesn't exist."""
+        """Store a document and its embedding for vector search (RAG)."""
+        self.retrieval_backend.add([{"doc_id": doc_id, "text": text, "embedding": embedding}], index_name)
+
+    def store_documents_with_embeddings(self, docs: List[Dict[str, Any]], index_name: str = "rag_docs", batch_size: int = 500) -> int:
+        """Store many documents in pipelined batches. Returns the number of Redis round trips."""
+        return self.retrieval_backend.add(docs, index_name, batch_size)
+
+    def document_keys(self, index_name: str = "rag_docs") -> List[str]:
+        """Keys of every document stored for an index, whether or not the manifest lists them"""
+        return self.retrieval_backend.keys(index_name)
+
+    def manifest_key(self, index_name: str = "rag_docs") -> str:
+        """Ingestion manifest of the retrieval backend: manifest:<index> for Redis, manifest:<backend>:<index> otherwise.
+
+        Backends are filled separately, so a file ingested into one must still count as new for the other.
+        """
+        if self.retrieval_backend.name == RedisVectorBackend.name:
+            return f"manifest:{index_name}"
+        return f"manifest:{self.retrieval_backend.name}:{index_name}"
+
+    def get_ingest_manifest(self, index_name: str = "rag_docs") -> Dict[str, Dict[str, Any]]:
+        """Load the ingestion manifest (path -> mtime, content hash, chunk keys)."""
+        raw = self.redis_client.hgetall(self.manifest_key(index_name))
+        return {path.decode('utf-8'): json.loads(entry) for path, entry in raw.items()}
+
+    def update_ingest_manifest(self, entries: Dict[str, Dict[str, Any]], removed: List[str], stale_keys: List[str],
+                               index_name: str = "rag_docs"):
+        """Record ingested files and drop removed files and stale chunk keys in one round trip."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        if entries:
+            pipe.hset(self.manifest_key(index_name), mapping={path: json.dumps(entry) for path, entry in entries.items()})
+        if removed:
+            pipe.hdel(self.manifest_key(index_name), *removed)
+        if stale_keys and isinstance(self.retrieval_backend, RedisVectorBackend):
+            pipe.delete(*stale_keys)
+        elif stale_keys:
+            self.retrieval_backend.delete(stale_keys)
+        if len(pipe):
+            pipe.execute()
+
+    def create_vector_index(self, index_name: str = "rag_docs", dim: int = None, algorithm: str = "FLAT",
+                            vector_type: str = None, m: int = 16, ef_construction: int = 200,
+                            ef_runtime: int = 10, prefix: str = None):
+        """Create a Redis vector index for RAG if it doesn't exist.
+
+        algorithm is FLAT (exact linear scan) or HNSW (approximate; tuned by m,
+        ef_construction and ef_runtime). The vector field is always queryable
+        as @embedding, whatever hash field backs it.
+        """
+        if self.index_exists(index_name):
+            return  # Already created, possibly as an alias after a migration
+        dim = dim or self.embedding_dim
+        vector_type = vector_type or self.vector_type
+        params = ["TYPE", vector_type, "DIM", dim, "DISTANCE_METRIC", "COSINE"]
+        if algorithm == "HNSW":
+            params += ["M", m, "EF_CONSTRUCTION", ef_construction, "EF_RUNTIME", ef_runtime]
         try:
             self.redis_client.execute_command(
-                "FT.CREATE", index_name, "ON", "HASH", "PREFIX", "1", f"{index_name}:",
-                "SCHEMA", "text", "TEXT", "embedding", "VECTOR", "FLAT", "6", "TYPE", "FLOAT32", "DIM", dim, "DISTANCE_METRIC", "COSINE"
+                "FT.CREATE", index_name, "ON", "HASH", "PREFIX", "1", f"{prefix or index_name}:",
+                "SCHEMA", "text", "TEXT", "source", "TAG",
+                vector_field_name(dim, vector_type), "AS", "embedding", "VECTOR", algorithm, len(params), *params
             )
         except Exception as e:
             if "Index already exists" in str(e):
                 pass  # Already created
             else:
                 print(f"Error creating vector index: {e}")
+
+    def index_exists(self, index_name: str) -> bool:
+        """Whether an index (or an alias) with this name exists."""
+        try:
+            self.redis_client.execute_command("FT.INFO", index_name)
+            return True
+        except redis.ResponseError:
+            return False
+
+    def wait_for_indexing(self, index_name: str, timeout: float = 600, poll_interval: float = 0.5):
+        """Block until an index has finished its background scan of existing documents."""
+        deadline = time.monotonic() + timeout
+        while True:
+            info = self.redis_client.execute_command("FT.INFO", index_name)
+            info = reply_map(info)
+            if int(info[b"indexing"]) == 0:
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Index {index_name} still indexing after {timeout}s")
+            time.sleep(poll_interval)
+
+    def migrate_vector_index(self, alias: str, new_index: str, dim: int = None, algorithm: str = "HNSW",
+                             vector_type: str = None, m: int = 16, ef_construction: int = 200,
+                             ef_runtime: int = 10, batch_size: int = 500, timeout: float = 600):
+        """Move the documents under alias to a new index definition.
+
+        Vectors for a new shape are backfilled from the full-size 'embedding' field,
+        or from the current index's field for documents ingested in a reduced shape;
+        documents with neither abort the migration before anything is swapped. The
+        new index is built in the background while readers keep using the current
+        one, then the alias is swapped over and the old index is dropped (its
+        documents are kept). An index that was created under the alias name itself
+        has to be dropped before the alias can be added, so the first migration
+        leaves a brief gap where searches fail; later ones swap atomically.
+        """
+        dim = dim or self.embedding_dim
+        vector_type = vector_type or self.vector_type
+        info = self.redis_client.execute_command("FT.INFO", alias)
+        current = reply_map(info)[b"index_name"].decode()
+
+        field = vector_field_name(dim, vector_type)
+        source = index_vector_field(info)
+        if field != source:
+            self._backfill_vector_field(f"{alias}:", field, dim, vector_type, batch_size, source)
+        self.create_vector_index(new_index, dim, algorithm, vector_type, m, ef_construction, ef_runtime, prefix=alias)
+        self.wait_for_indexing(new_index, timeout)
+
+        if current == alias:
+            # Index and alias cannot share a name, so there is a brief gap on the very first swap
+            self.redis_client.execute_command("FT.DROPINDEX", current)
+            self.redis_client.execute_command("FT.ALIASADD", alias, new_index)
+        else:
+            self.redis_client.execute_command("FT.ALIASUPDATE", alias, new_index)
+            self.redis_client.execute_command("FT.DROPINDEX", current)
+
+    def _backfill_vector_field(self, prefix: str, field: str, dim: int, vector_type: str, batch_size: int,
+                               source: str = "embedding"):
+        """Write vectors in a new shape, derived from the full-size float32 'embedding' field when a document
+        has one and from the source field (the current index's) otherwise.
+
+        Raises ValueError when documents have no vector the new shape can be derived from (the source
+        field is missing or smaller than dim); they need re-embedding with a full ingest.
+        """
+        source_dim, source_type = vector_field_shape(source)
+        keys = list(self.redis_client.scan_iter(match=f"{prefix}*", count=batch_size, _type="HASH"))
+        unusable = 0
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key in batch:
+                pipe.hmget(key, "embedding", source, scale_field_name(source))
+            for key, (full, stored, scale) in zip(batch, pipe.execute()):
+                if full is not None:
+                    if field == "embedding":
+                        continue
+                    vector = np.frombuffer(full, dtype=np.float32)
+                elif stored is not None and source_dim >= dim:
+                    vector = decode_vectors([stored], source_dim, source_type, [scale])[0]
+                else:
+                    unusable += 1
+                    continue
+                pipe.hset(key, field, encode_vector(vector, dim, vector_type))
+                if vector_type == "INT8":
+                    pipe.hset(key, scale_field_name(field), int8_scale(prepare_vector(vector, dim)))
+            if len(pipe):
+                pipe.execute()
+        if unusable:
+            raise ValueError(f"{unusable} documents under {prefix} have no vector to derive {field} from; "
+                             "re-ingest them with --full instead of migrating")
     
     def embed_text(self, text: str) -> list:
-        """Get embedding for text using OpenAI API."""
-        resp = client.embeddings.create(input=[text], model="text-embedding-3-small")
-        return resp.data[0].embedding
+        """Get embedding for text using OpenAI API, served from the embedding cache when possible."""
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts: List[str]) -> List[list]:
+        """Get embeddings for a batch of texts; only cache misses go to the embedder (or OpenAI API) in a single call."""
+        if not texts:
+            return []
+        embeddings = self.embedding_cache.get_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        record_cache_lookups(len(texts), len(missing))
+        if missing:
+            if self.embed_batcher is not None:
+                fresh = self.embed_batcher([texts[i] for i in missing])
+            else:
+                fresh = self._embed_uncached([texts[i] for i in missing])
+            self.embedding_cache.put_many([texts[i] for i in missing], fresh)
+            for i, embedding in zip(missing, fresh):
+                embeddings[i] = embedding
+        return [embedding.tolist() if isinstance(embedding, np.ndarray) else embedding for embedding in embeddings]
+
+    def _embed_uncached(self, texts: List[str]) -> List[list]:
+        if self.embedder is not None:
+            telemetry.add("embedding_tokens", estimate_tokens(texts))
+            return self.embedder.embed(texts)
+        resp = get_openai_client().embeddings.create(**embedding_request_args(texts, self.embedding_dim))
+        record_embedding_usage(resp, texts)
+        # The API may return items out of order; restore input order by index
+        return [item.embedding for item in sorted(resp.data, key=lambda item: item.index)]
+
+    def embedding_metrics(self) -> Dict[str, float]:
+        """Scheduler and micro-batching metrics for embedding calls (empty without a scheduler)"""
+        if self.scheduler is None:
+            return {}
+        return {**self.scheduler.metrics(), **self.embed_batcher.metrics()}
+
+    def query_similar_documents(self, query: str, k: int = 3, index_name: str = "rag_docs",
+                                ef_runtime: Optional[int] = None) -> list:
+        """Query the retrieval backend for top-k similar documents using vector search."""
+        embedding = self.embed_text(query)
+        return self.retrieval_backend.search(embedding, k, index_name, ef_runtime)
+
+    def query_similar_documents_batch(self, queries: List[str], k: int = 3, index_name: str = "rag_docs",
+                                      ef_runtime: Optional[int] = None) -> List[list]:
+        """Top-k similar documents for many queries, in query order.
+
+        All queries are embedded in one API request (per EMBED_REQUEST_LIMIT inputs)
+        and searched in one batched call to the retrieval backend.
+        """
+        embeddings = []
+        for start in range(0, len(queries), EMBED_REQUEST_LIMIT):
+            embeddings.extend(self.embed_texts(queries[start:start + EMBED_REQUEST_LIMIT]))
+        if not embeddings:
+            return []
+        return self.retrieval_backend.search_batch(embeddings, k, index_name, ef_runtime)
+
+    def get_vectors(self, keys: List[str]) -> np.ndarray:
+        """Stored vectors for document keys (as returned in search results' "id")"""
+        return self.retrieval_backend.get_vectors(keys)
+
+    def query_hybrid_documents(self, query: str, k: int = 3, index_name: str = "rag_docs",
+                               tags: Optional[Dict[str, List[str]]] = None, ef_runtime: Optional[int] = None) -> list:
+        """Top-k documents by reciprocal rank fusion of BM25 full-text and vector KNN results.
 
-    def query_similar_documents(self, query: str, k: int = 3, index_name: str = "rag_docs") -> list:
-        """Query Redis for top-k similar documents using vector search."""
+        tags pre-filters both queries by TAG fields, e.g. {"source": ["ai.tensorset"]}.
+        """
         embedding = self.embed_text(query)
-        query_vec = np.array(embedding, dtype=np.float32).tobytes()
-        # Use FT.SEARCH with vector similarity
+        return self.retrieval_backend.hybrid_search_batch([query], [embedding], k, index_name, tags, ef_runtime)[0]
+
+@instrument
+class AsyncRedisAIClient:
+    """Async counterpart of RedisAIClient over redis.asyncio and AsyncOpenAI.
+
+    One instance owns a blocking connection pool (REDIS_* environment settings
+    unless overridden) and should be shared by every concurrent session on the
+    event loop. Public methods are traced as spans like RedisAIClient's.
+    A retrieval_backend other than Redis (e.g. NumpyVectorBackend) is searched
+    in a worker thread instead of the Redis index.
+    """
+
+    def __init__(self, host=None, port=None, db=None, max_connections: Optional[int] = None,
+                 embedding_cache: EmbeddingCache = None, embedding_dim: int = DEFAULT_EMBEDDING_DIM,
+                 vector_type: str = "FLOAT32", memory: ConversationMemory = None,
+                 embedder: Optional[LocalEmbedder] = None, scheduler: Optional[RequestScheduler] = None,
+                 rescore_oversample: int = DEFAULT_RESCORE_OVERSAMPLE,
+                 retrieval_backend: Optional[RetrievalBackend] = None):
+        self.embedding_dim = embedding_dim
+        self.vector_type = vector_type
+        self.vector_field = vector_field_name(embedding_dim, vector_type)
+        self.rescore_oversample = rescore_oversample if vector_type != "FLOAT32" else 1
+        self.embedder = embedder
+        self.scheduler = scheduler
+        # Redis searches go through the async pool; other backends are blocking in-process calls
+        self.local_backend = None
+        if retrieval_backend is not None and retrieval_backend.name != RedisVectorBackend.name:
+            self.local_backend = retrieval_backend
+        self.embed_batcher = None
+        if scheduler is not None:
+            self.embed_batcher = AsyncMicroBatcher(
+                lambda batch: scheduler.acall(self._embed_uncached, batch, tokens=estimate_tokens(batch)))
+        self.redis_client = create_async_redis_client(host=host, port=port, db=db, max_connections=max_connections)
+        self.pool = self.redis_client.connection_pool
+        self._openai_client = None
+        # The LRU layer can be shared with a sync RedisAIClient; Redis I/O goes through the async client
+        self.embedding_cache = embedding_cache or EmbeddingCache(
+            None, embedder.model_name if embedder else embedding_model_key(embedding_dim))
+        # Likewise, memory settings and the summarizer can be shared; I/O goes through the async client
+        self.memory = memory or ConversationMemory(None)
+
+    @property
+    def openai_client(self):
+        """AsyncOpenAI client, created on first use (see get_openai_client)"""
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+            self._openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._openai_client
+
+    async def warm_up(self, connections: int = DEFAULT_WARM_CONNECTIONS) -> int:
+        """Async variant of RedisAIClient.warm_up, opening connections of this client's pool"""
+        opened = await awarm_pool(self.pool, connections)
+        # Loading the tokenizer and importing openai block, so they run off the event loop
+        await asyncio.to_thread(get_encoder)
+        if self.embedder is None:
+            await asyncio.to_thread(lambda: self.openai_client)
+        return opened
+
+    async def store_conversation(self, session_id: str, message: str, response: str):
+        """Store conversation data in Redis (bounded list, rolling summary of older turns)"""
+        await self.memory.astore(self.redis_client, session_id, message, response)
+
+    async def get_conversation_history(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Retrieve conversation history from Redis"""
+        return (await self.get_conversation_context(session_id, limit))[0]
+
+    async def get_conversation_context(self, session_id: str, limit: int = None) -> Tuple[List[Dict[str, Any]], str]:
+        """Retrieve recent turns (newest first) and the rolling summary of older turns"""
+        try:
+            return await self.memory.aload(self.redis_client, session_id, limit)
+        except Exception as e:
+            print(f"Error retrieving conversation history: {e}")
+            return [], ""
+
+    async def embed_text(self, text: str) -> list:
+        """Get embedding for text, served from the embedding cache when possible."""
+        return (await self.embed_texts([text]))[0]
+
+    async def embed_texts(self, texts: List[str]) -> List[list]:
+        """Get embeddings for a batch of texts; only cache misses go to the embedder (or OpenAI API) in a single call."""
+        if not texts:
+            return []
+        embeddings = await self.embedding_cache.aget_many(self.redis_client, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        record_cache_lookups(len(texts), len(missing))
+        if missing:
+            if self.embed_batcher is not None:
+                fresh = await self.embed_batcher([texts[i] for i in missing])
+            else:
+                fresh = await self._embed_uncached([texts[i] for i in missing])
+            await self.embedding_cache.aput_many(self.redis_client, [texts[i] for i in missing], fresh)
+            for i, embedding in zip(missing, fresh):
+                embeddings[i] = embedding
+        return [embedding.tolist() if isinstance(embedding, np.ndarray) else embedding for embedding in embeddings]
+
+    async def _embed_uncached(self, texts: List[str]) -> List[list]:
+        if self.embedder is not None:
+            # Local models block (RedisAI call or CPU inference), so they run off the event loop
+            telemetry.add("embedding_tokens", estimate_tokens(texts))
+            return await asyncio.to_thread(self.embedder.embed, texts)
+        resp = await self.openai_client.embeddings.create(**embedding_request_args(texts, self.embedding_dim))
+        record_embedding_usage(resp, texts)
+        return [item.embedding for item in sorted(resp.data, key=lambda item: item.index)]
+
+    def embedding_metrics(self) -> Dict[str, float]:
+        """Scheduler and micro-batching metrics for embedding calls (empty without a scheduler)"""
+        if self.scheduler is None:
+            return {}
+        return {**self.scheduler.metrics(), **self.embed_batcher.metrics()}
+
+    async def query_similar_documents(self, query: str, k: int = 3, index_name: str = "rag_docs",
+                                      ef_runtime: Optional[int] = None) -> list:
+        """Query the retrieval backend for top-k similar documents using vector search."""
+        embedding = await self.embed_text(query)
         try:
-            result = self.redis_client.execute_command(
-                "FT.SEARCH", index_name,
-                f"*=>[KNN {k} @embedding $vec as score]",
-                "PARAMS", "2", "vec", query_vec,
-                "SORTBY", "score", "ASC",
-                "RETURN", "2", "text", "score",
-                "DIALECT", "2",
-                "LIMIT", "0", str(k))
-            docs = []
-            for i in range(1, len(result), 2):
-                doc = result[i+1]
-                docs.append({"score": float(doc[1].decode()), "text": doc[3].decode()})
-            return docs
+            return (await self._search_batch([embedding], k, index_name, ef_runtime))[0]
         except Exception as e:
             print(f"Error querying similar documents: {e}")
-            return [] 
\ No newline at end of file
+            return []
+
+    async def _search_batch(self, embeddings: List[list], k: int, index_name: str,
+                            ef_runtime: Optional[int]) -> List[list]:
+        """KNN searches in one pipeline, plus one for the final texts when rescoring (see RedisVectorBackend)"""
+        if self.local_backend is not None:
+            return await asyncio.to_thread(self.local_backend.search_batch, embeddings, k, index_name, ef_runtime)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for embedding in embeddings:
+            query_vec = encode_vector(embedding, self.embedding_dim, self.vector_type)
+            if self.rescore_oversample > 1:
+                pipe.execute_command(*rescore_search_args(
+                    query_vec, k * self.rescore_oversample, index_name, self.vector_field, ef_runtime))
+            else:
+                pipe.execute_command(*knn_search_args(query_vec, k, index_name, ef_runtime))
+        replies = await pipe.execute(raise_on_error=False)
+        if self.rescore_oversample <= 1:
+            return parse_knn_replies(replies)
+        found = parse_rescored_replies(replies, embeddings, k, self.embedding_dim, self.vector_type, self.vector_field)
+        queue_text_reads(pipe, found)
+        return fill_texts(found, await pipe.execute() if len(pipe) else [])
+
+    async def query_similar_documents_batch(self, queries: List[str], k: int = 3, index_name: str = "rag_docs",
+                                            ef_runtime: Optional[int] = None, batch_size: int = 500) -> List[list]:
+        """Async variant of RedisAIClient.query_similar_documents_batch over one Redis pipeline per batch"""
+        results = []
+        for start in range(0, len(queries), EMBED_REQUEST_LIMIT):
+            embeddings = await self.embed_texts(queries[start:start + EMBED_REQUEST_LIMIT])
+            for offset in range(0, len(embeddings), batch_size):
+                batch = embeddings[offset:offset + batch_size]
+                try:
+                    results.extend(await self._search_batch(batch, k, index_name, ef_runtime))
+                except redis.RedisError as e:
+                    print(f"Error querying similar documents: {e}")
+                    results.extend([] for _ in batch)
+        return results
+
+    async def query_hybrid_documents(self, query: str, k: int = 3, index_name: str = "rag_docs",
+                                     tags: Optional[Dict[str, List[str]]] = None, ef_runtime: Optional[int] = None,
+                                     candidates: int = 20) -> list:
+        """Async variant of RedisAIClient.query_hybrid_documents; both searches go out in one pipeline"""
+        embedding = await self.embed_text(query)
+        if self.local_backend is not None:
+            return (await asyncio.to_thread(self.local_backend.hybrid_search_batch, [query], [embedding], k,
+                                            index_name, tags, ef_runtime, candidates))[0]
+        pipe = self.redis_client.pipeline(transaction=False)
+        counts = [queue_hybrid_search(pipe, query, encode_vector(embedding, self.embedding_dim, self.vector_type),
+                                      index_name, tags, ef_runtime, candidates)]
+        try:
+            return fuse_hybrid_replies(await pipe.execute(raise_on_error=False), counts, k)[0]
+        except redis.RedisError as e:
+            print(f"Error querying similar documents: {e}")
+            return []
+
+    async def get_vectors(self, keys: List[str]) -> np.ndarray:
+        """Stored vectors for document keys (as returned in search results' "id"), in one round trip"""
+        if self.local_backend is not None:
+            return await asyncio.to_thread(self.local_backend.get_vectors, keys)
+        pipe = self.redis_client.pipeline(transaction=False)
+        queue_vector_reads(pipe, keys, self.vector_field)
+        return decode_vector_reads(await pipe.execute(), self.embedding_dim, self.vector_type)
+
+    async def close(self):
+        await self.redis_client.aclose()
+        await self.pool.disconnect() 
\ No newline at end of file
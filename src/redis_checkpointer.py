@@ -0,0 +1,191 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+import msgpack
+import redis
+import redis.asyncio
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (WRITES_IDX_MAP, BaseCheckpointSaver, ChannelVersions, Checkpoint,
+                                       CheckpointMetadata, CheckpointTuple, get_checkpoint_id)
+from langgraph.checkpoint.serde.types import TASKS
+
+VALUE_PREFIX = b"v:"
+
+
+class RedisCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer keeping the latest checkpoint of each thread in Redis.
+
+    checkpoint:{thread_id}:{ns} is one hash with the checkpoint (without its
+    channel values), its metadata and the current value of every channel under
+    v:<channel>. A put writes only the channels whose version changed since the
+    previous checkpoint, and drops channels that were emptied, in one MULTI
+    round trip. Pending task writes go to a :writes hash, which moves to
+    :parent_writes when the next checkpoint is put. Loading a thread is a
+    single pipelined round trip. Every key expires ttl seconds after the
+    thread's last write.
+
+    Only the latest checkpoint is kept, so list() yields at most one tuple and
+    older checkpoint ids are not found. Deltas assume one writer per thread
+    at a time, which the server's session lock guarantees. Values are encoded
+    by the serde as msgpack.
+    """
+
+    def __init__(self, redis_client: redis.Redis, async_redis_client: Optional[redis.asyncio.Redis] = None,
+                 ttl: int = 3600, serde=None):
+        super().__init__(serde=serde)
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.ttl = ttl
+
+    @staticmethod
+    def _keys(config: RunnableConfig) -> Tuple[str, str, str]:
+        configurable = config["configurable"]
+        # The braces are a cluster hash tag, keeping all keys of a thread in one slot
+        key = f"checkpoint:{{{configurable['thread_id']}}}:{configurable.get('checkpoint_ns', '')}"
+        return key, f"{key}:writes", f"{key}:parent_writes"
+
+    def _pack(self, value: Any) -> bytes:
+        return msgpack.packb(self.serde.dumps_typed(value))
+
+    def _unpack(self, data: bytes) -> Any:
+        type_, payload = msgpack.unpackb(data)
+        return self.serde.loads_typed((type_, payload))
+
+    def _load_pipeline(self, pipe, config: RunnableConfig):
+        for key in self._keys(config):
+            pipe.hgetall(key)
+        return pipe
+
+    def _parse(self, config: RunnableConfig, replies: list) -> Optional[CheckpointTuple]:
+        head, writes, parent_writes = replies
+        if not head:
+            return None
+        checkpoint_id = head[b"id"].decode()
+        requested = get_checkpoint_id(config)
+        if requested and requested != checkpoint_id:
+            return None
+        parent_id = head[b"parent"].decode() or None
+        checkpoint = self._unpack(head[b"checkpoint"])
+        checkpoint["channel_values"] = {field[len(VALUE_PREFIX):].decode(): self._unpack(value)
+                                        for field, value in head.items() if field.startswith(VALUE_PREFIX)}
+        checkpoint["pending_sends"] = [self._unpack(value) for _, channel, value in self._writes(parent_writes, parent_id)
+                                       if channel == TASKS] if parent_id else []
+        configurable = config["configurable"]
+        ns = configurable.get("checkpoint_ns", "")
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": configurable["thread_id"], "checkpoint_ns": ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint=checkpoint,
+            metadata=self._unpack(head[b"metadata"]),
+            parent_config={"configurable": {"thread_id": configurable["thread_id"], "checkpoint_ns": ns,
+                                            "checkpoint_id": parent_id}} if parent_id else None,
+            pending_writes=[(task_id, channel, self._unpack(value))
+                            for task_id, channel, value in self._writes(writes, checkpoint_id)],
+        )
+
+    @staticmethod
+    def _writes(writes: Dict[bytes, bytes], checkpoint_id: Optional[str]) -> List[Tuple[str, str, bytes]]:
+        """(task_id, channel, packed value) writes of one checkpoint, in task and write order"""
+        prefix = f"{checkpoint_id}|".encode()
+        entries = []
+        for field, value in writes.items():
+            if field.startswith(prefix):
+                entries.append((int(field.rsplit(b"|", 1)[1]), msgpack.unpackb(value)))
+        return [tuple(write) for _, write in sorted(entries, key=lambda entry: (entry[1][0], entry[0]))]
+
+    def _put_pipeline(self, pipe, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                      new_versions: ChannelVersions):
+        key, writes_key, parent_writes_key = self._keys(config)
+        values = checkpoint["channel_values"]
+        stored = {k: v for k, v in checkpoint.items() if k not in ("channel_values", "pending_sends")}
+        mapping = {
+            "id": checkpoint["id"],
+            "parent": config["configurable"].get("checkpoint_id") or "",
+            "checkpoint": self._pack(stored),
+            "metadata": self._pack(metadata),
+        }
+        for channel in new_versions:
+            if channel in values:
+                mapping[VALUE_PREFIX + channel.encode()] = self._pack(values[channel])
+        emptied = [VALUE_PREFIX + channel.encode() for channel in checkpoint["channel_versions"]
+                   if channel not in values]
+        pipe.hset(key, mapping=mapping)
+        if emptied:
+            pipe.hdel(key, *emptied)
+        pipe.delete(parent_writes_key)
+        pipe.copy(writes_key, parent_writes_key)
+        pipe.delete(writes_key)
+        for k in (key, parent_writes_key):
+            pipe.expire(k, self.ttl)
+        return pipe
+
+    def _put_writes_pipeline(self, pipe, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str):
+        _, writes_key, _ = self._keys(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        pipe.hset(writes_key, mapping={
+            f"{checkpoint_id}|{task_id}|{WRITES_IDX_MAP.get(channel, idx)}":
+                msgpack.packb([task_id, channel, self._pack(value)])
+            for idx, (channel, value) in enumerate(writes)
+        })
+        pipe.expire(writes_key, self.ttl)
+        return pipe
+
+    @staticmethod
+    def _saved_config(config: RunnableConfig, checkpoint: Checkpoint) -> RunnableConfig:
+        configurable = config["configurable"]
+        return {"configurable": {"thread_id": configurable["thread_id"],
+                                 "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        pipe = self._load_pipeline(self.redis_client.pipeline(transaction=False), config)
+        return self._parse(config, pipe.execute())
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        if config is None or limit == 0:
+            return
+        saved = self.get_tuple(config)
+        if saved is None or (before and get_checkpoint_id(before) and
+                             saved.config["configurable"]["checkpoint_id"] >= get_checkpoint_id(before)):
+            return
+        if filter and any(saved.metadata.get(key) != value for key, value in filter.items()):
+            return
+        yield saved
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        self._put_pipeline(self.redis_client.pipeline(), config, checkpoint, metadata, new_versions).execute()
+        return self._saved_config(config, checkpoint)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        if writes:
+            self._put_writes_pipeline(self.redis_client.pipeline(transaction=False), config, writes, task_id).execute()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        if self.async_redis_client is None:
+            return await asyncio.to_thread(self.get_tuple, config)
+        pipe = self._load_pipeline(self.async_redis_client.pipeline(transaction=False), config)
+        return self._parse(config, await pipe.execute())
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for saved in await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before,
+                                                                    limit=limit))):
+            yield saved
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        if self.async_redis_client is None:
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+        await self._put_pipeline(self.async_redis_client.pipeline(), config, checkpoint, metadata,
+                                 new_versions).execute()
+        return self._saved_config(config, checkpoint)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        if not writes:
+            return
+        if self.async_redis_client is None:
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id)
+        await self._put_writes_pipeline(self.async_redis_client.pipeline(transaction=False), config, writes,
+                                        task_id).execute()
@@ -0,0 +1,194 @@
+import os
+import socket
+import threading
+from typing import Any, Dict, List, Tuple
+import redis
+import redis.asyncio
+from redis.utils import HIREDIS_AVAILABLE
+from telemetry import telemetry
+
+# Probe dead peers after a minute idle, then every 10s, giving up after 3 misses
+KEEPALIVE_OPTIONS = {
+    getattr(socket, name): value
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+    if hasattr(socket, name)
+}
+
+# RedisAI runs beside Redis Stack, which holds 6379; docker-compose publishes it on 6380
+DEFAULT_REDISAI_PORT = 6380
+
+
+def packed_size(command) -> int:
+    """Bytes in a packed command (one buffer or a list of buffers)"""
+    if isinstance(command, (bytes, str, memoryview)):
+        return len(command)
+    return sum(len(part) for part in command)
+
+
+def reply_size(reply) -> int:
+    """Approximate payload bytes of a parsed reply"""
+    if isinstance(reply, (bytes, str)):
+        return len(reply)
+    if isinstance(reply, (list, tuple, set)):
+        return sum(reply_size(item) for item in reply)
+    if isinstance(reply, dict):
+        return sum(reply_size(key) + reply_size(value) for key, value in reply.items())
+    return 8 if isinstance(reply, (int, float)) else 0
+
+
+class InstrumentedConnection(redis.Connection):
+    """Connection that counts round trips and payload bytes in telemetry (a pipeline is one round trip)"""
+
+    def send_packed_command(self, command, *args, **kwargs):
+        telemetry.add("redis_round_trips")
+        telemetry.add("redis_bytes_sent", packed_size(command))
+        return super().send_packed_command(command, *args, **kwargs)
+
+    def read_response(self, *args, **kwargs):
+        response = super().read_response(*args, **kwargs)
+        telemetry.add("redis_bytes_received", reply_size(response))
+        return response
+
+
+class AsyncInstrumentedConnection(redis.asyncio.Connection):
+    """Async variant of InstrumentedConnection"""
+
+    async def send_packed_command(self, command, *args, **kwargs):
+        telemetry.add("redis_round_trips")
+        telemetry.add("redis_bytes_sent", packed_size(command))
+        return await super().send_packed_command(command, *args, **kwargs)
+
+    async def read_response(self, *args, **kwargs):
+        response = await super().read_response(*args, **kwargs)
+        telemetry.add("redis_bytes_received", reply_size(response))
+        return response
+
+
+_pools: Dict[Tuple, redis.BlockingConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def redis_settings_from_env() -> Dict[str, Any]:
+    """Connection settings from REDIS_* environment variables"""
+    return {
+        "host": os.getenv("REDIS_HOST", "localhost"),
+        "port": int(os.getenv("REDIS_PORT", "6379")),
+        "db": int(os.getenv("REDIS_DB", "0")),
+        "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+        "pool_timeout": float(os.getenv("REDIS_POOL_TIMEOUT", "5")),
+        "socket_timeout": float(os.getenv("REDIS_SOCKET_TIMEOUT", "5")),
+        "socket_connect_timeout": float(os.getenv("REDIS_CONNECT_TIMEOUT", "2")),
+        "health_check_interval": int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")),
+        "protocol": int(os.getenv("REDIS_PROTOCOL", "2")),
+    }
+
+
+def _pool_kwargs(settings: Dict[str, Any], connection_class) -> Dict[str, Any]:
+    return {
+        "connection_class": connection_class,
+        "host": settings["host"],
+        "port": settings["port"],
+        "db": settings["db"],
+        "max_connections": settings["max_connections"],
+        "timeout": settings["pool_timeout"],
+        "socket_timeout": settings["socket_timeout"],
+        "socket_connect_timeout": settings["socket_connect_timeout"],
+        "socket_keepalive": True,
+        "socket_keepalive_options": KEEPALIVE_OPTIONS,
+        "health_check_interval": settings["health_check_interval"],
+        "retry_on_timeout": True,
+        "protocol": settings["protocol"],
+    }
+
+
+def _settings(overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Environment settings with the non-None overrides applied"""
+    return {**redis_settings_from_env(), **{key: value for key, value in overrides.items() if value is not None}}
+
+
+def get_connection_pool(**overrides) -> redis.BlockingConnectionPool:
+    """Process-wide connection pool for a server, created on first use.
+
+    Callers asking for the same host, port, db and protocol share one pool, so
+    every client, agent and worker thread in the process draws from the same
+    max_connections sockets and waits up to pool_timeout for a free one instead
+    of opening more. Connections are opened lazily, kept alive with TCP
+    keepalive and health-checked after health_check_interval seconds idle.
+    redis-py resets the pool in a forked child. The replies are parsed by
+    hiredis when it is installed. Round trips and payload bytes are counted
+    in telemetry.
+    """
+    settings = _settings(overrides)
+    key = (settings["host"], settings["port"], settings["db"], settings["protocol"])
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = redis.BlockingConnectionPool(**_pool_kwargs(settings, InstrumentedConnection))
+        return pool
+
+
+def get_redis_client(**overrides) -> redis.Redis:
+    """Client over the shared pool for REDIS_* settings, with keyword overrides (e.g. host, port)"""
+    return redis.Redis(connection_pool=get_connection_pool(**overrides))
+
+
+def create_async_redis_client(**overrides) -> redis.asyncio.Redis:
+    """redis.asyncio client over a new blocking pool with the same settings.
+
+    Async connections belong to the event loop they were opened on, so this
+    pool is not cached; create one per loop and share it between its sessions.
+    """
+    pool = redis.asyncio.BlockingConnectionPool(
+        **_pool_kwargs(_settings(overrides), AsyncInstrumentedConnection))
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
+def warm_pool(pool: redis.BlockingConnectionPool, connections: int = 1) -> int:
+    """Open up to connections sockets of a pool ahead of traffic, so early requests skip the TCP connect.
+
+    Returns the number of connections that were checked out, each connected before it is handed out.
+    """
+    held = []
+    try:
+        for _ in range(min(connections, pool.max_connections)):
+            held.append(pool.get_connection("PING"))
+    finally:
+        for connection in held:
+            pool.release(connection)
+    return len(held)
+
+
+async def awarm_pool(pool: redis.asyncio.BlockingConnectionPool, connections: int = 1) -> int:
+    """Async variant of warm_pool, for the pool of the running event loop"""
+    held = []
+    try:
+        for _ in range(min(connections, pool.max_connections)):
+            held.append(await pool.get_connection("PING"))
+    finally:
+        for connection in held:
+            await pool.release(connection)
+    return len(held)
+
+
+def pool_stats(pool: redis.BlockingConnectionPool) -> Dict[str, Any]:
+    """Open and idle connection counts of a shared pool"""
+    return {
+        "max_connections": pool.max_connections,
+        "open": len(pool._connections),
+        "idle": sum(1 for connection in pool.pool.queue if connection is not None),
+        "hiredis": HIREDIS_AVAILABLE,
+    }
+
+
+def reply_map(reply) -> Dict:
+    """Field map of a key/value reply in RESP2 (flat list) or RESP3 (map) form"""
+    if isinstance(reply, dict):
+        return reply
+    return dict(zip(reply[::2], reply[1::2]))
+
+
+def search_hits(reply) -> List[Tuple[bytes, Dict]]:
+    """(key, fields) pairs of an FT.SEARCH reply, best first, in RESP2 or RESP3 form"""
+    if isinstance(reply, dict):
+        return [(hit[b"id"], hit[b"extra_attributes"]) for hit in reply[b"results"]]
+    return [(key, reply_map(doc)) for key, doc in zip(reply[1::2], reply[2::2])]
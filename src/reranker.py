@@ -0,0 +1,99 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+import numpy as np
+from retrieval_backends import normalize_rows
+
+
+def mmr_select(relevance: np.ndarray, doc_vectors: np.ndarray, k: int, lambda_mult: float = 0.7,
+               duplicate_threshold: float = 0.97) -> List[int]:
+    """Indices of up to k documents chosen by maximal marginal relevance.
+
+    Each pick maximizes lambda * relevance - (1 - lambda) * (max cosine similarity
+    to the documents already picked); candidates nearly identical to a pick
+    (cosine >= duplicate_threshold) are dropped outright.
+    """
+    vectors = normalize_rows(np.asarray(doc_vectors, dtype=np.float32))
+    similarity = vectors @ vectors.T
+    available = np.ones(len(vectors), dtype=bool)
+    redundancy = np.full(len(vectors), -1.0, dtype=np.float32)
+    selected = []
+    while len(selected) < k and available.any():
+        scores = relevance if not selected else lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        best = int(np.argmax(np.where(available, scores, -np.inf)))
+        selected.append(best)
+        available[best] = False
+        available &= similarity[best] < duplicate_threshold
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+class CrossEncoderScorer:
+    """Small cross-encoder that scores (query, passage) pairs on CPU, loaded once on first use"""
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", max_length: int = 512):
+        self.model_name = model_name
+        self.max_length = max_length
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                from transformers import AutoModelForSequenceClassification, AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self._model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        """Relevance of each text to the query in [0, 1]"""
+        import torch
+        self.load()
+        inputs = self._tokenizer([query] * len(texts), texts, padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="pt")
+        with torch.inference_mode():
+            logits = self._model(**inputs).logits[:, 0]
+        return torch.sigmoid(logits).numpy()
+
+
+class Reranker:
+    """Reorders over-fetched retrieval candidates within a latency budget.
+
+    Relevance is the cosine similarity to the query, or the cross-encoder score
+    when one is configured; MMR then removes near-duplicates and diversifies the
+    top k. If the budget (seconds) runs out, the original retrieval order is kept.
+    """
+
+    def __init__(self, candidates: int = 10, lambda_mult: float = 0.7, duplicate_threshold: float = 0.97,
+                 cross_encoder: Optional[CrossEncoderScorer] = None, budget: float = 0.25):
+        self.candidates = candidates
+        self.lambda_mult = lambda_mult
+        self.duplicate_threshold = duplicate_threshold
+        self.cross_encoder = cross_encoder
+        self.budget = budget
+        # A scoring run that overshoots keeps the worker busy, so later calls fall back too until it finishes
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cross-encoder")
+        self.fallbacks = 0
+
+    def rerank(self, query: str, query_vector: list, docs: List[Dict[str, Any]], doc_vectors: np.ndarray,
+               k: int = 3) -> List[Dict[str, Any]]:
+        if len(docs) <= 1:
+            return docs[:k]
+        deadline = time.perf_counter() + self.budget
+        if self.cross_encoder is not None:
+            future = self._executor.submit(self.cross_encoder.score, query, [doc["text"] for doc in docs])
+            try:
+                relevance = future.result(timeout=max(deadline - time.perf_counter(), 0))
+            except FutureTimeoutError:
+                self.fallbacks += 1
+                return docs[:k]
+        else:
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+            relevance = normalize_rows(np.asarray(doc_vectors, dtype=np.float32)) @ (
+                query_vector / max(float(np.linalg.norm(query_vector)), 1e-12))
+        order = mmr_select(relevance, doc_vectors, k, self.lambda_mult, self.duplicate_threshold)
+        if time.perf_counter() > deadline:
+            self.fallbacks += 1
+            return docs[:k]
+        return [docs[i] for i in order]
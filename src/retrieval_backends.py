@@ -0,0 +1,241 @@
+import os
+import json
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+class RetrievalBackend:
+    """Interface for vector stores behind RedisAIClient.
+
+    Documents are dicts with "doc_id", "text", "embedding" and optionally the
+    chunk's "tokens" count, "source" document and "section" heading path;
+    searches return [{"id", "score", "text", "tokens"}] ordered best first, where id is the
+    document key, score is the cosine distance (the fused RRF score for hybrid
+    searches) and tokens may be None.
+    """
+
+    # Each backend keeps its own ingest manifest (see RedisAIClient.manifest_key)
+    name = "custom"
+
+    def add(self, docs: List[Dict[str, Any]], index_name: str = "rag_docs", batch_size: int = 500) -> int:
+        """Store documents; returns the number of round trips made."""
+        raise NotImplementedError
+
+    def delete(self, keys: List[str]):
+        """Remove documents by key ("<index_name>:<doc_id>")."""
+        raise NotImplementedError
+
+    def keys(self, index_name: str = "rag_docs") -> List[str]:
+        """Keys of every stored document of an index."""
+        raise NotImplementedError
+
+    def get_vectors(self, keys: List[str]) -> np.ndarray:
+        """Stored vectors for document keys as a float32 matrix; unknown keys give zero rows."""
+        raise NotImplementedError
+
+    def search_batch(self, embeddings: List[list], k: int = 3, index_name: str = "rag_docs",
+                     ef_runtime: Optional[int] = None) -> List[list]:
+        """Top-k documents for each query embedding, in query order."""
+        raise NotImplementedError
+
+    def search(self, embedding: list, k: int = 3, index_name: str = "rag_docs",
+               ef_runtime: Optional[int] = None) -> list:
+        return self.search_batch([embedding], k, index_name, ef_runtime)[0]
+
+    def hybrid_search_batch(self, queries: List[str], embeddings: List[list], k: int = 3,
+                            index_name: str = "rag_docs", tags: Optional[Dict[str, List[str]]] = None,
+                            ef_runtime: Optional[int] = None, candidates: int = 20) -> List[list]:
+        """Top-k documents fusing full-text and vector rankings; backends without a text index use vectors only."""
+        if tags:
+            raise NotImplementedError(f"{type(self).__name__} does not support tag filters")
+        return self.search_batch(embeddings, k, index_name, ef_runtime)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class NumpyVectorBackend(RetrievalBackend):
+    """In-process exact vector search over a contiguous float32 matrix.
+
+    Vectors are normalized once on insert, so cosine similarity is a plain
+    matrix product. With a path, vectors are appended to a raw float32 file
+    that is memory-mapped for search, and ids/texts go to an append-only log;
+    overwritten and deleted rows are masked out until compact() rewrites them.
+    """
+
+    name = "numpy"
+
+    def __init__(self, path: Optional[str] = None, dim: int = 1536, block_rows: int = 65536):
+        self.path = path
+        self.dim = dim
+        self.block_rows = block_rows
+        self._ids: List[str] = []
+        self._texts: List[Optional[str]] = []
+        self._tokens: List[Optional[int]] = []
+        self._row_of: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._index_rows: Dict[str, np.ndarray] = {}
+        self._buffer = np.empty((0, dim), dtype=np.float32)
+        self._matrix = self._buffer
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.path, "docs.jsonl")
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    def _load(self):
+        rows = 0
+        if os.path.exists(self._log_path):
+            with open(self._log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry.get("deleted"):
+                        self._kill(entry["id"])
+                    else:
+                        self._track(entry["id"], entry["text"], entry.get("tokens"))
+                        rows += 1
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) > rows * self.dim * 4:
+            # Vectors written by an append whose log entries never made it to disk
+            os.truncate(self._vectors_path, rows * self.dim * 4)
+        self._remap(rows)
+
+    def _remap(self, rows: int):
+        if rows:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        else:
+            self._matrix = np.empty((0, self.dim), dtype=np.float32)
+
+    def _kill(self, key: str):
+        row = self._row_of.pop(key, None)
+        if row is not None:
+            self._alive[row] = False
+            self._texts[row] = None
+
+    def _track(self, key: str, text: str, tokens: Optional[int] = None):
+        self._kill(key)
+        self._row_of[key] = len(self._ids)
+        self._ids.append(key)
+        self._texts.append(text)
+        self._tokens.append(tokens)
+        if len(self._alive) < len(self._ids):
+            grown = np.zeros(max(2 * len(self._alive), 1024), dtype=bool)
+            grown[:len(self._alive)] = self._alive
+            self._alive = grown
+        self._alive[len(self._ids) - 1] = True
+
+    def add(self, docs: List[Dict[str, Any]], index_name: str = "rag_docs", batch_size: int = 500) -> int:
+        if docs:
+            vectors = np.asarray([doc["embedding"] for doc in docs], dtype=np.float32)[:, :self.dim]
+            self._append([f"{index_name}:{doc['doc_id']}" for doc in docs], [doc["text"] for doc in docs],
+                         normalize_rows(vectors), [doc.get("tokens") for doc in docs])
+        return 0
+
+    def _append(self, keys: List[str], texts: List[str], vectors: np.ndarray, tokens: List[Optional[int]]):
+        start = len(self._ids)
+        for key, text, count in zip(keys, texts, tokens):
+            self._track(key, text, count)
+        rows = len(self._ids)
+        if self.path:
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                for key, text, count in zip(keys, texts, tokens):
+                    f.write(json.dumps({"id": key, "text": text, "tokens": count}) + "\n")
+            self._remap(rows)
+        else:
+            # Grow the in-memory buffer geometrically so appends stay amortized O(1)
+            if rows > len(self._buffer):
+                grown = np.empty((max(rows, 2 * len(self._buffer)), self.dim), dtype=np.float32)
+                grown[:start] = self._buffer[:start]
+                self._buffer = grown
+            self._buffer[start:rows] = vectors
+            self._matrix = self._buffer[:rows]
+
+    def delete(self, keys: List[str]):
+        keys = [key for key in keys if key in self._row_of]
+        for key in keys:
+            self._kill(key)
+        if self.path and keys:
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                for key in keys:
+                    f.write(json.dumps({"id": key, "deleted": True}) + "\n")
+
+    def keys(self, index_name: str = "rag_docs") -> List[str]:
+        return [key for key in self._row_of if key.startswith(f"{index_name}:")]
+
+    def _rows_of_index(self, index_name: str) -> np.ndarray:
+        """Mask of the rows keyed under index_name, rebuilt when rows are appended"""
+        rows = len(self._ids)
+        mask = self._index_rows.get(index_name)
+        if mask is None or len(mask) != rows:
+            prefix = f"{index_name}:"
+            mask = self._index_rows[index_name] = np.fromiter(
+                (key.startswith(prefix) for key in self._ids), dtype=bool, count=rows)
+        return mask
+
+    def get_vectors(self, keys: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(keys), self.dim), dtype=np.float32)
+        for i, key in enumerate(keys):
+            row = self._row_of.get(key)
+            if row is not None:
+                vectors[i] = self._matrix[row]
+        return vectors
+
+    def search_batch(self, embeddings: List[list], k: int = 3, index_name: str = "rag_docs",
+                     ef_runtime: Optional[int] = None) -> List[list]:
+        if k <= 0:
+            return [[] for _ in embeddings]
+        queries = normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)[:, :self.dim])
+        rows = len(self._ids)
+        searchable = self._alive[:rows] & self._rows_of_index(index_name)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        # Scan in blocks so a large memory-mapped matrix is paged in once per batch of queries
+        for start in range(0, rows, self.block_rows):
+            block = self._matrix[start:start + self.block_rows]
+            scores = queries @ block.T
+            scores[:, ~searchable[start:start + len(block)]] = -np.inf
+            candidates = np.concatenate([best_scores, scores], axis=1)
+            candidate_rows = np.concatenate(
+                [best_rows, np.broadcast_to(np.arange(start, start + len(block)), scores.shape)], axis=1)
+            keep = min(k, candidates.shape[1])
+            top = np.argpartition(-candidates, keep - 1, axis=1)[:, :keep]
+            best_scores = np.take_along_axis(candidates, top, axis=1)
+            best_rows = np.take_along_axis(candidate_rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        results = []
+        for scores, found in zip(np.take_along_axis(best_scores, order, axis=1),
+                                 np.take_along_axis(best_rows, order, axis=1)):
+            results.append([{"id": self._ids[row], "score": float(1.0 - score), "text": self._texts[row],
+                             "tokens": self._tokens[row]}
+                            for score, row in zip(scores, found) if np.isfinite(score)])
+        return results
+
+    def compact(self):
+        """Rewrite storage without overwritten or deleted rows."""
+        live = np.flatnonzero(self._alive[:len(self._ids)])
+        vectors = np.array(self._matrix[live])
+        entries = [(self._ids[row], self._texts[row], self._tokens[row]) for row in live]
+        self._ids, self._texts, self._tokens, self._row_of = [], [], [], {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._index_rows = {}
+        self._buffer = np.empty((0, self.dim), dtype=np.float32)
+        self._matrix = self._buffer
+        if self.path:
+            for name in (self._vectors_path, self._log_path):
+                if os.path.exists(name):
+                    os.remove(name)
+        if len(live):
+            self._append([key for key, _, _ in entries], [text for _, text, _ in entries], vectors,
+                         [count for _, _, count in entries])
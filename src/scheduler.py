@@ -0,0 +1,300 @@
+import time
+import queue
+import random
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    """Cheap token estimate for rate limiting (about four characters per token)"""
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, from the Retry-After header of a 429 response"""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate tokens per second.
+
+    reserve() takes tokens immediately, letting the balance go negative, and
+    returns how long the caller must wait before its share is actually earned,
+    so sync callers can sleep and async callers can await without holding a lock.
+    Reservations larger than capacity are charged in full, pushing later callers back.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(-self._tokens / self.rate, 0.0)
+
+
+class RequestScheduler:
+    """Shared admission control for calls to a rate-limited provider.
+
+    Caps in-flight calls, paces them with request and token buckets sized from
+    the provider quota (per minute), and retries rate-limit (429) errors with
+    jittered exponential backoff, honouring Retry-After. Sync and async callers
+    have separate concurrency caps of max_concurrent each; the buckets are shared.
+    """
+
+    def __init__(self, max_concurrent: int = 16, requests_per_minute: float = 500,
+                 tokens_per_minute: float = 200000, max_retries: int = 6, base_delay: float = 0.5,
+                 max_delay: float = 30.0):
+        self.max_concurrent = max_concurrent
+        self.requests = TokenBucket(requests_per_minute / 60, max(requests_per_minute / 60, 1))
+        self.tokens = TokenBucket(tokens_per_minute / 60, max(tokens_per_minute / 60, 1))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._async_semaphore = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttle_seconds = 0.0
+
+    def _count(self, field: str, delta: float):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def _admission_delay(self, tokens: int) -> float:
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        self._count("throttle_seconds", delay)
+        return delay
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        self._count("rate_limited", 1)
+        self._count("retries", 1)
+        # Full jitter keeps concurrent retries from arriving in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after(error) or 0.0)
+
+    @contextmanager
+    def slot(self, tokens: int = 0):
+        """Hold one concurrency slot, after waiting for the rate limits; for streaming calls"""
+        self._count("waiting", 1)
+        try:
+            time.sleep(self._admission_delay(tokens))
+            self._semaphore.acquire()
+        finally:
+            self._count("waiting", -1)
+        self._count("in_flight", 1)
+        self._count("calls", 1)
+        try:
+            yield
+        finally:
+            self._count("in_flight", -1)
+            self._semaphore.release()
+
+    def call(self, fn: Callable, *args, tokens: int = 0, **kwargs) -> Any:
+        """Run fn within a slot, retrying rate-limit errors"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.slot(tokens):
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt, e))
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int = 0):
+        """Async variant of slot"""
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._count("waiting", 1)
+        try:
+            await asyncio.sleep(self._admission_delay(tokens))
+            await self._async_semaphore.acquire()
+        finally:
+            self._count("waiting", -1)
+        self._count("in_flight", 1)
+        self._count("calls", 1)
+        try:
+            yield
+        finally:
+            self._count("in_flight", -1)
+            self._async_semaphore.release()
+
+    async def acall(self, fn: Callable[..., Awaitable], *args, tokens: int = 0, **kwargs) -> Any:
+        """Async variant of call for a coroutine function"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.aslot(tokens):
+                    return await fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+        }
+
+
+class BatchStats:
+    """Queue depth and batch size counters shared by the micro-batchers"""
+
+    def __init__(self):
+        self.queue_depth = 0
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+
+    def record(self, size: int):
+        self.batches += 1
+        self.items += size
+        self.max_batch_size = max(self.max_batch_size, size)
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+        }
+
+
+class MicroBatcher(BatchStats):
+    """Coalesces concurrent calls of fn(items) -> results into batched calls.
+
+    Requests arriving within max_wait seconds of the first one (or until
+    max_batch items are queued) are concatenated into one call; batches are
+    dispatched to a pool of max_concurrent threads so slow calls overlap.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 256, max_wait: float = 0.005,
+                 max_concurrent: int = 8):
+        super().__init__()
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="micro-batch")
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, items: List[Any]) -> Future:
+        future: Future = Future()
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._collect, name="micro-batcher", daemon=True)
+                self._worker.start()
+            self.queue_depth += len(items)
+        self._queue.put((items, future))
+        return future
+
+    def __call__(self, items: List[Any]) -> List[Any]:
+        if len(items) >= self.max_batch:
+            return self.fn(items)  # Already a full batch
+        return self.submit(items).result()
+
+    def _collect(self):
+        while True:
+            requests = [self._queue.get()]
+            size = len(requests[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    request = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request[0])
+            with self._worker_lock:
+                self.queue_depth -= size
+            self.record(size)
+            self._executor.submit(self._dispatch, requests)
+
+    def _dispatch(self, requests: List[tuple]):
+        try:
+            results = self.fn([item for items, _ in requests for item in items])
+        except Exception as e:
+            for _, future in requests:
+                future.set_exception(e)
+            return
+        start = 0
+        for items, future in requests:
+            future.set_result(results[start:start + len(items)])
+            start += len(items)
+
+
+class AsyncMicroBatcher(BatchStats):
+    """Async variant of MicroBatcher for a coroutine function, on the running event loop"""
+
+    def __init__(self, fn: Callable[[List[Any]], Awaitable[List[Any]]], max_batch: int = 256,
+                 max_wait: float = 0.005):
+        super().__init__()
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[tuple] = []
+        self._timer = None
+
+    async def __call__(self, items: List[Any]) -> List[Any]:
+        if len(items) >= self.max_batch:
+            return await self.fn(items)  # Already a full batch
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((items, future))
+        self.queue_depth += len(items)
+        if self.queue_depth >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        requests, self._pending = self._pending, []
+        if requests:
+            self.record(self.queue_depth)
+            self.queue_depth = 0
+            asyncio.ensure_future(self._dispatch(requests))
+
+    async def _dispatch(self, requests: List[tuple]):
+        try:
+            results = await self.fn([item for items, _ in requests for item in items])
+        except Exception as e:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        start = 0
+        for items, future in requests:
+            if not future.done():
+                future.set_result(results[start:start + len(items)])
+            start += len(items)
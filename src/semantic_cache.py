@@ -0,0 +1,106 @@
+import hashlib
+import re
+from typing import Callable, Dict, Optional
+import numpy as np
+import redis
+from redis_connections import search_hits
+
+
+def escape_tag(value: str) -> str:
+    """Escape punctuation in a RediSearch TAG value"""
+    return re.sub(r"([^A-Za-z0-9_])", r"\\\1", value)
+
+
+class SemanticCache:
+    """Cache of (question embedding, answer) pairs in a dedicated Redis vector index.
+
+    Entries are tagged with a namespace generation; invalidating a namespace
+    bumps its generation so older answers stop matching and expire via TTL.
+    """
+
+    def __init__(self, redis_client: redis.Redis, embed: Callable[[str], list], threshold: float = 0.92,
+                 ttl: int = 24 * 3600, index_name: str = "semantic_cache", dim: int = 1536):
+        self.redis_client = redis_client
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.index_name = index_name
+        self.dim = dim
+        self.hits = 0
+        self.misses = 0
+        self._index_ready = False
+
+    def create_index(self):
+        """Create the cache vector index if it doesn't exist."""
+        try:
+            self.redis_client.execute_command(
+                "FT.CREATE", self.index_name, "ON", "HASH", "PREFIX", "1", f"{self.index_name}:",
+                "SCHEMA", "namespace", "TAG", "answer", "TEXT", "NOINDEX",
+                "embedding", "VECTOR", "HNSW", "6", "TYPE", "FLOAT32", "DIM", self.dim, "DISTANCE_METRIC", "COSINE"
+            )
+        except Exception as e:
+            if "Index already exists" not in str(e):
+                print(f"Error creating semantic cache index: {e}")
+        self._index_ready = True
+
+    def _generation_tag(self, namespace: str) -> str:
+        generation = self.redis_client.get(f"{self.index_name}_generation:{namespace}")
+        return f"{namespace}:{int(generation or 0)}"
+
+    def lookup(self, question: str, namespace: str = "rag_docs") -> Optional[Dict[str, object]]:
+        """Return {"answer", "similarity"} for the closest cached question above the threshold, else None."""
+        if not self._index_ready:
+            self.create_index()
+        embedding = self.embed(question)
+        try:
+            tag = escape_tag(self._generation_tag(namespace))
+            result = self.redis_client.execute_command(
+                "FT.SEARCH", self.index_name,
+                f"(@namespace:{{{tag}}})=>[KNN 1 @embedding $vec AS score]",
+                "PARAMS", "2", "vec", np.asarray(embedding, dtype=np.float32).tobytes(),
+                "SORTBY", "score", "ASC",
+                "RETURN", "2", "answer", "score",
+                "DIALECT", "2",
+                "LIMIT", "0", "1")
+        except Exception as e:
+            print(f"Error querying semantic cache: {e}")
+            result = [0]
+        hits = search_hits(result)
+        if hits:
+            fields = hits[0][1]
+            similarity = 1.0 - float(fields[b"score"])
+            if similarity >= self.threshold:
+                self.hits += 1
+                return {"answer": fields[b"answer"].decode("utf-8"), "similarity": similarity}
+        self.misses += 1
+        return None
+
+    def store(self, question: str, answer: str, namespace: str = "rag_docs"):
+        """Cache an answer for a question under the namespace's current generation"""
+        embedding = self.embed(question)
+        try:
+            tag = self._generation_tag(namespace)
+            key = f"{self.index_name}:{hashlib.sha256(f'{tag}:{question}'.encode('utf-8')).hexdigest()}"
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(key, mapping={
+                "namespace": tag,
+                "question": question,
+                "answer": answer,
+                "embedding": np.asarray(embedding, dtype=np.float32).tobytes()
+            })
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"Error storing in semantic cache: {e}")
+
+    def invalidate(self, namespace: str = "rag_docs") -> int:
+        """Invalidate all cached answers for a namespace, e.g. after the doc corpus is re-ingested"""
+        return self.redis_client.incr(f"{self.index_name}_generation:{namespace}")
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Sentiment classification served by RedisAI
+
+Export a small Hugging Face sentiment classifier to TorchScript (softmax
+included) and store it in RedisAI:
+
+    python sentiment.py --out models/sentiment.pt --store
+"""
+
+import os
+import queue
+import asyncio
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List, Optional
+import numpy as np
+import redis
+from embedding_cache import normalize_text
+from redis_connections import DEFAULT_REDISAI_PORT, get_redis_client
+
+DEFAULT_SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+DEFAULT_SENTIMENT_KEY = "sentiment:distilbert-sst2"
+
+
+def export_sentiment_model(model_name: str, out_path: str, max_length: int = 128) -> str:
+    """Trace model_name into a TorchScript module mapping (input_ids, attention_mask) to class probabilities"""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    class SoftmaxClassifier(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return torch.softmax(self.model(input_ids=input_ids, attention_mask=attention_mask)[0], dim=1)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    classifier = SoftmaxClassifier(AutoModelForSequenceClassification.from_pretrained(model_name, torchscript=True).eval())
+    example = tokenizer(["I love this", "this is terrible"], padding="max_length", truncation=True,
+                        max_length=max_length, return_tensors="pt")
+    with torch.inference_mode():
+        traced = torch.jit.trace(classifier, (example["input_ids"], example["attention_mask"]))
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    traced.save(out_path)
+    return out_path
+
+
+class SentimentAnalyzer:
+    """Classifies user turns as positive, negative or neutral with a RedisAI model.
+
+    Concurrent requests are queued and grouped by a worker thread into one
+    AI.DAGEXECUTE per micro-batch (up to max_batch texts, waiting at most
+    max_wait seconds for more after the first). Labels are cached per
+    normalized text. The model is binary (SST-2); predictions below
+    neutral_threshold confidence are reported as neutral.
+    """
+
+    def __init__(self, ai_client: redis.Redis, model_key: str = DEFAULT_SENTIMENT_KEY,
+                 tokenizer_name: str = DEFAULT_SENTIMENT_MODEL, labels: tuple = ("negative", "positive"),
+                 max_batch: int = 32, max_wait: float = 0.005, max_length: int = 128,
+                 neutral_threshold: float = 0.75, cache_size: int = 10000, device: str = "CPU"):
+        self.ai_client = ai_client
+        self.model_key = model_key
+        self.tokenizer_name = tokenizer_name
+        self.labels = labels
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_length = max_length
+        self.neutral_threshold = neutral_threshold
+        self.cache_size = cache_size
+        self.device = device
+        self._tokenizer = None
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.batches = 0
+        self.timeouts = 0
+
+    def model_exists(self) -> bool:
+        try:
+            self.ai_client.execute_command("AI.MODELGET", self.model_key, "META")
+            return True
+        except redis.ResponseError:
+            return False
+
+    def store_model(self, model_path: str):
+        with open(model_path, "rb") as f:
+            blob = f.read()
+        self.ai_client.execute_command(
+            "AI.MODELSTORE", self.model_key, "TORCH", self.device, "BATCHSIZE", self.max_batch, "BLOB", blob)
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._cache_lock:
+            label = self._cache.get(key)
+            if label is not None:
+                self._cache.move_to_end(key)
+            return label
+
+    def _remember(self, key: str, label: str):
+        with self._cache_lock:
+            self._cache[key] = label
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def submit(self, text: str) -> Future:
+        """Queue text for classification; the future resolves to its label"""
+        future: Future = Future()
+        key = normalize_text(text)
+        label = self._cached(key)
+        if label is not None:
+            future.set_result(label)
+            return future
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_worker, name="sentiment-batcher", daemon=True)
+                self._worker.start()
+        self._queue.put((key, future))
+        return future
+
+    def analyze(self, text: str, timeout: Optional[float] = None) -> str:
+        """Label for text; "neutral" if the model does not answer within timeout seconds"""
+        try:
+            return self.submit(text).result(timeout=timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            return "neutral"
+        except Exception as e:
+            print(f"Error analyzing sentiment: {e}")
+            return "neutral"
+
+    async def aanalyze(self, text: str, timeout: Optional[float] = None) -> str:
+        """Async variant of analyze"""
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.submit(text)), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return "neutral"
+        except Exception as e:
+            print(f"Error analyzing sentiment: {e}")
+            return "neutral"
+
+    def _run_worker(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+            # Identical texts in one batch are classified once. Futures cancelled by a
+            # caller's timeout are dropped; the rest are marked running and can no longer be cancelled.
+            pending = {}
+            for key, future in batch:
+                if future.set_running_or_notify_cancel():
+                    pending.setdefault(key, []).append(future)
+            if not pending:
+                continue
+            try:
+                labels = self.classify(list(pending))
+                for (key, futures), label in zip(pending.items(), labels):
+                    self._remember(key, label)
+                    for future in futures:
+                        future.set_result(label)
+            except Exception as e:
+                for futures in pending.values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _tokenize(self, texts: List[str]):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+        encoded = self._tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                  return_tensors="np")
+        return encoded["input_ids"].astype(np.int64), encoded["attention_mask"].astype(np.int64)
+
+    def classify(self, texts: List[str]) -> List[str]:
+        """Labels for a batch of texts with a single AI.DAGEXECUTE"""
+        input_ids, attention_mask = self._tokenize(texts)
+        rows, length = input_ids.shape
+        reply = self.ai_client.execute_command(
+            "AI.DAGEXECUTE", "ROUTING", self.model_key,
+            "|>", "AI.TENSORSET", "input_ids", "INT64", rows, length, "BLOB", input_ids.tobytes(),
+            "|>", "AI.TENSORSET", "attention_mask", "INT64", rows, length, "BLOB", attention_mask.tobytes(),
+            "|>", "AI.MODELEXECUTE", self.model_key, "INPUTS", 2, "input_ids", "attention_mask", "OUTPUTS", 1, "probs",
+            "|>", "AI.TENSORGET", "probs", "BLOB")
+        self.batches += 1
+        probs = np.frombuffer(reply[-1], dtype=np.float32).reshape(rows, len(self.labels))
+        return [self.labels[int(row.argmax())] if row.max() >= self.neutral_threshold else "neutral" for row in probs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_SENTIMENT_MODEL, help="Hugging Face sequence classifier")
+    parser.add_argument("--out", default=os.path.join("models", "sentiment.pt"), help="TorchScript output path")
+    parser.add_argument("--store", action="store_true", help="Also AI.MODELSTORE the model into RedisAI")
+    parser.add_argument("--model-key", default=DEFAULT_SENTIMENT_KEY)
+    parser.add_argument("--ai-host", default=os.getenv("REDISAI_HOST", "localhost"))
+    parser.add_argument("--ai-port", type=int, default=int(os.getenv("REDISAI_PORT", DEFAULT_REDISAI_PORT)))
+    args = parser.parse_args()
+
+    path = export_sentiment_model(args.model, args.out)
+    print(f"Exported {args.model} to {path}")
+    if args.store:
+        analyzer = SentimentAnalyzer(get_redis_client(host=args.ai_host, port=args.ai_port), model_key=args.model_key,
+                                     tokenizer_name=args.model)
+        analyzer.store_model(path)
+        print(f"Stored as RedisAI model {args.model_key}")
+
+
+if __name__ == "__main__":
+    main()
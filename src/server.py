@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+HTTP and WebSocket front end for the agent
+
+Runs N worker processes that all listen on the same port (SO_REUSEPORT, so
+the kernel spreads connections across them); each worker serves many
+sessions concurrently on one event loop with shared Redis pools.
+
+    POST /v1/messages            {"message": "...", "session_id": "..."} -> result JSON
+    POST /v1/messages?stream=1   same body -> server-sent events: token events, then a done event
+    GET  /v1/ws                  WebSocket; send {"message", "session_id"}, receive token/done frames
+    GET  /healthz                readiness (Redis ping); 503 while draining
+    GET  /metrics                Prometheus text from telemetry
+
+    python server.py --workers 4 --port 8080
+"""
+
+import os
+import json
+import uuid
+import signal
+import asyncio
+import argparse
+import multiprocessing
+from contextlib import asynccontextmanager
+from typing import Dict, List
+from aiohttp import WSMsgType, web
+from redis.exceptions import LockError
+from dotenv import load_dotenv
+from main import configure_telemetry, create_agent, create_async_client, create_redis_client
+from telemetry import telemetry
+
+
+class Overloaded(Exception):
+    """Raised when the admission queue is full"""
+
+
+class AdmissionController:
+    """Bounded admission: at most max_concurrent turns run per worker and at most
+    max_queue wait for a slot; beyond that requests are rejected immediately
+    (503 with Retry-After) so load balancers can route elsewhere instead of
+    letting latency grow without bound.
+    """
+
+    def __init__(self, max_concurrent: int = 64, max_queue: int = 256):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.waiting = 0
+        self.running = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            telemetry.add("server_rejected")
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+
+class SessionLocks:
+    """Serializes the turns of one session.
+
+    Turns of a session queue in arrival order on an in-process lock, then take
+    a Redis lock on lock:conversation:{session_id}, so turns routed to
+    different workers never race on the stored conversation either. The Redis
+    lock expires after ttl seconds in case a worker dies holding it, and is
+    extended every ttl/3 seconds while the turn runs, so a slow turn keeps it.
+    """
+
+    def __init__(self, redis_client, ttl: float = 120, wait: float = 60):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.wait = wait
+        self._locks: Dict[str, List] = {}
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                lock = self.redis_client.lock(f"lock:conversation:{session_id}", timeout=self.ttl,
+                                              sleep=0.05, blocking_timeout=self.wait)
+                if not await lock.acquire():
+                    raise LockError("Unable to acquire lock within the time specified")
+                keep_alive = asyncio.ensure_future(self._keep_alive(lock))
+                try:
+                    yield
+                finally:
+                    keep_alive.cancel()
+                    # The turn's result is already written; losing the lock here must not fail the response
+                    try:
+                        await lock.release()
+                    except LockError as e:
+                        print(f"Error releasing session lock for {session_id}: {e}")
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[session_id]
+
+    async def _keep_alive(self, lock):
+        """Reset the lock's expiry to ttl every ttl/3 seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await lock.reacquire()
+            except LockError as e:
+                print(f"Error extending session lock: {e}")
+                return
+
+
+def bad_request(error: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(text=json.dumps({"error": error}), content_type="application/json")
+
+
+def parse_turn(body):
+    """(message, session_id) of a decoded request body; HTTPBadRequest unless it is a JSON object with a message"""
+    if not isinstance(body, dict):
+        raise bad_request("expected a JSON object")
+    message = body.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise bad_request("message is required")
+    session_id = body.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        raise bad_request("session_id must be a string")
+    return message, session_id or str(uuid.uuid4())
+
+
+@asynccontextmanager
+async def turn(app: web.Application, session_id: str):
+    """The session's ordering lock, then an admission slot, for one turn.
+
+    The slot is taken last so turns queued behind another turn of their session
+    do not hold slots that other sessions could use.
+    """
+    if app["draining"]:
+        raise Overloaded()
+    async with app["session_locks"].hold(session_id), app["admission"].admit():
+        yield
+
+
+def overloaded_response() -> web.Response:
+    return web.json_response({"error": "server busy, retry later"}, status=503, headers={"Retry-After": "1"})
+
+
+async def handle_message(request: web.Request) -> web.StreamResponse:
+    app = request.app
+    try:
+        body = await request.json()
+    except ValueError:
+        raise bad_request("invalid JSON")
+    message, session_id = parse_turn(body)
+    stream = request.query.get("stream", "").lower() in ("1", "true", "yes")
+    try:
+        async with turn(app, session_id):
+            if not stream:
+                return web.json_response(await app["agent"].aprocess_message(message, session_id))
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+            await response.prepare(request)
+            tokens = app["agent"].aprocess_message_stream(message, session_id)
+            async for token in tokens:
+                await response.write(f"event: token\ndata: {json.dumps(token)}\n\n".encode("utf-8"))
+            await response.write(f"event: done\ndata: {json.dumps(tokens.result)}\n\n".encode("utf-8"))
+            await response.write_eof()
+            return response
+    except (Overloaded, LockError):
+        return overloaded_response()
+
+
+async def handle_websocket(request: web.Request) -> web.WebSocketResponse:
+    """One turn per text frame, answered with token frames and a done frame, in order"""
+    app = request.app
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    app["websockets"].add(ws)
+    try:
+        async for frame in ws:
+            if frame.type != WSMsgType.TEXT:
+                continue
+            try:
+                message, session_id = parse_turn(json.loads(frame.data))
+            except (ValueError, web.HTTPBadRequest):
+                await ws.send_json({"type": "error", "error": "expected {\"message\": ..., \"session_id\": ...}"})
+                continue
+            try:
+                async with turn(app, session_id):
+                    tokens = app["agent"].aprocess_message_stream(message, session_id)
+                    async for token in tokens:
+                        await ws.send_json({"type": "token", "content": token})
+                    await ws.send_json({"type": "done", **tokens.result})
+            except (Overloaded, LockError):
+                await ws.send_json({"type": "error", "error": "server busy, retry later"})
+    finally:
+        app["websockets"].discard(ws)
+    return ws
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    app = request.app
+    if app["draining"]:
+        return web.json_response({"status": "draining"}, status=503)
+    try:
+        await app["async_client"].redis_client.ping()
+    except Exception as e:
+        return web.json_response({"status": "unavailable", "error": str(e)}, status=503)
+    admission = app["admission"]
+    return web.json_response({"status": "ok", "pid": os.getpid(), "running": admission.running,
+                              "waiting": admission.waiting, "rejected": admission.rejected})
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=telemetry.prometheus_text(), content_type="text/plain")
+
+
+async def on_startup(app: web.Application):
+    redis_client = create_redis_client()
+    app["async_client"] = create_async_client(redis_client)
+    app["agent"] = create_agent(redis_client, os.environ["OPENAI_API_KEY"], async_redis_client=app["async_client"])
+    app["session_locks"] = SessionLocks(app["async_client"].redis_client, ttl=float(os.getenv("SESSION_LOCK_TTL", "120")))
+    # Ready before the first request: pools connected, tokenizer and chat model loaded
+    await app["agent"].awarm_up()
+
+
+async def on_shutdown(app: web.Application):
+    # Stop admitting turns; in-flight handlers get the run_app shutdown timeout to finish
+    app["draining"] = True
+    for ws in list(app["websockets"]):
+        await ws.close(message=b"server shutting down")
+
+
+async def on_cleanup(app: web.Application):
+    await app["async_client"].close()
+    telemetry.flush()
+
+
+def create_app(max_concurrent: int = 64, max_queue: int = 256) -> web.Application:
+    app = web.Application()
+    app["admission"] = AdmissionController(max_concurrent, max_queue)
+    app["draining"] = False
+    app["websockets"] = set()
+    app.router.add_post("/v1/messages", handle_message)
+    app.router.add_get("/v1/ws", handle_websocket)
+    app.router.add_get("/healthz", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def run_worker(host: str, port: int, max_concurrent: int, max_queue: int, shutdown_timeout: float):
+    load_dotenv()
+    # Every worker would bind the same METRICS_PORT; the app serves /metrics on the shared port instead
+    configure_telemetry(serve_metrics=False)
+    # SIGTERM triggers aiohttp's graceful shutdown: stop listening, drain, then run cleanup
+    web.run_app(create_app(max_concurrent, max_queue), host=host, port=port, reuse_port=True,
+                shutdown_timeout=shutdown_timeout, print=None, handle_signals=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVER_WORKERS") or os.cpu_count() or 1))
+    parser.add_argument("--max-concurrent", type=int, default=int(os.getenv("SERVER_MAX_CONCURRENT", "64")),
+                        help="Turns run at once per worker")
+    parser.add_argument("--max-queue", type=int, default=int(os.getenv("SERVER_MAX_QUEUE", "256")),
+                        help="Turns waiting for a slot per worker before requests are rejected")
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0, help="Seconds to drain on shutdown")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not os.getenv("OPENAI_API_KEY"):
+        raise SystemExit("OPENAI_API_KEY not found in environment variables")
+    # Workers are spawned fresh, so each builds its own Redis pools and OpenAI clients
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_worker, name=f"agent-worker-{i}",
+                               args=(args.host, args.port, args.max_concurrent, args.max_queue, args.shutdown_timeout))
+               for i in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    print(f"🚀 Serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    def stop(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker in workers:
+        worker.join()
+    print("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
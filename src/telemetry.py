@@ -0,0 +1,293 @@
+import json
+import math
+import time
+import random
+import inspect
+import functools
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Cumulative bucket bounds (seconds) exposed to Prometheus; the histograms themselves are finer
+PROMETHEUS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Log-linear histogram in the style of HdrHistogram.
+
+    Values are counted in buckets whose width grows with the value, so any
+    recorded value is known to within precision (relative) while memory stays
+    proportional to the number of distinct magnitudes, not samples.
+    """
+
+    def __init__(self, precision: float = 0.01, min_value: float = 1e-6):
+        self.min_value = min_value
+        self._log_base = math.log1p(precision)
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        return int(math.log(max(value, self.min_value) / self.min_value) / self._log_base)
+
+    def _upper(self, index: int) -> float:
+        return self.min_value * math.exp((index + 1) * self._log_base)
+
+    def record(self, value: float):
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Value at quantile q in [0, 1], to within the histogram's precision"""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def cumulative(self, bounds: Tuple[float, ...]) -> List[int]:
+        """Number of values at or below each bound"""
+        totals = []
+        for bound in bounds:
+            totals.append(sum(count for index, count in self.counts.items() if self._upper(index) <= bound * (1 + 1e-9)))
+        return totals
+
+
+class Span:
+    """One timed operation with attributes, convertible to an OTLP span"""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.end_ns = None
+        self.duration = None
+
+    def to_otlp(self) -> Dict[str, Any]:
+        def value(v):
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": value(v)} for key, v in self.attributes.items()],
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+class InMemorySpanExporter:
+    """Keeps finished spans in a list; for tests and local inspection"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+    def clear(self):
+        self.spans = []
+
+
+class OTLPHttpExporter:
+    """Sends spans as OTLP/HTTP JSON to a collector (e.g. http://localhost:4318), off the request path"""
+
+    def __init__(self, endpoint: str, service_name: str = "redisai-agent", timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="otlp-export")
+
+    def payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "telemetry"}, "spans": [span.to_otlp() for span in spans]}],
+        }]}
+
+    def export(self, spans: List[Span]):
+        self._executor.submit(self._post, self.payload(spans))
+
+    def _post(self, payload: Dict[str, Any]):
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except Exception as e:
+            print(f"Error exporting spans: {e}")
+
+
+class Telemetry:
+    """Spans, latency histograms and counters for the agent and its clients.
+
+    span() times a block as a child of the current span (tracked per thread
+    and per asyncio task), records its duration in a per-name histogram and
+    hands it to the exporter in batches of export_batch. add() counts things
+    such as Redis round trips, bytes or tokens: globally, labelled by the
+    current span name, and as attributes of the current span and its ancestors.
+    """
+
+    def __init__(self, exporter=None, export_batch: int = 128):
+        self.exporter = exporter
+        self.export_batch = export_batch
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+        self._current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Start a span without making it current; finish it with end_span"""
+        return Span(name, parent if parent is not None else self._current.get(), attributes)
+
+    def end_span(self, span: Span):
+        span.duration = time.perf_counter() - span._start
+        span.end_ns = span.start_ns + int(span.duration * 1e9)
+        batch = None
+        with self._lock:
+            self.histograms.setdefault(span.name, Histogram()).record(span.duration)
+            if self.exporter is not None:
+                self._pending.append(span)
+                if len(self._pending) >= self.export_batch:
+                    batch, self._pending = self._pending, []
+        if batch:
+            self.exporter.export(batch)
+
+    @contextmanager
+    def activate(self, span: Span):
+        """Make span the parent of spans and counts in this block"""
+        token = self._current.set(span)
+        try:
+            yield span
+        finally:
+            self._current.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = self.start_span(name, **attributes)
+        try:
+            with self.activate(span):
+                yield span
+        except Exception as e:
+            span.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            self.end_span(span)
+
+    def add(self, key: str, value: float = 1, span: Optional[Span] = None):
+        """Count value under key for span (default: the current span)"""
+        span = span if span is not None else self._current.get()
+        with self._lock:
+            label = span.name if span is not None else ""
+            self.counters[(key, label)] = self.counters.get((key, label), 0) + value
+            while span is not None:
+                span.attributes[key] = span.attributes.get(key, 0) + value
+                span = span.parent
+
+    def flush(self):
+        """Export spans still waiting for a full batch"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch and self.exporter is not None:
+            self.exporter.export(batch)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count and p50/p95/p99 latency (ms) per span name"""
+        with self._lock:
+            return {name: {"count": h.count,
+                           "p50_ms": round(h.percentile(0.50) * 1000, 2),
+                           "p95_ms": round(h.percentile(0.95) * 1000, 2),
+                           "p99_ms": round(h.percentile(0.99) * 1000, 2)}
+                    for name, h in sorted(self.histograms.items())}
+
+    def prometheus_text(self) -> str:
+        """Histograms and counters in the Prometheus text exposition format"""
+        lines = ["# TYPE span_duration_seconds histogram"]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                for bound, count in zip(PROMETHEUS_BUCKETS, h.cumulative(PROMETHEUS_BUCKETS)):
+                    lines.append(f'span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'span_duration_seconds_sum{{span="{name}"}} {h.sum}')
+                lines.append(f'span_duration_seconds_count{{span="{name}"}} {h.count}')
+            for key in sorted({key for key, _ in self.counters}):
+                lines.append(f"# TYPE {key}_total counter")
+                for (counter, label), value in sorted(self.counters.items()):
+                    if counter == key:
+                        lines.append(f'{key}_total{{span="{label}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Serve prometheus_text() at /metrics from a daemon thread"""
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = telemetry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+# Process-wide instance used by the agent, the clients and the Redis connection pools
+telemetry = Telemetry()
+
+
+def instrument(cls):
+    """Class decorator wrapping each public method in a "<Class>.<method>" span"""
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(fn):
+            continue
+        setattr(cls, name, _traced(f"{cls.__name__}.{name}", fn))
+    return cls
+
+
+def _traced(span_name: str, fn: Callable) -> Callable:
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with telemetry.span(span_name):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with telemetry.span(span_name):
+            return fn(*args, **kwargs)
+    return wrapper
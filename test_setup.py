@@ -7,6 +7,9 @@ import os
 import sys
 from dotenv import load_dotenv
 
+# The modules in src/ import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
 def test_imports():
     """Test if all required packages can be imported"""
     print("🔍 Testing imports...")
@@ -46,7 +49,7 @@ def test_redis_connection():
     print("\n🔍 Testing Redis connection...")
     
     try:
-        from src.redis_ai_client import RedisAIClient
+        from redis_ai_client import RedisAIClient
         redis_client = RedisAIClient()
         redis_client.redis_client.ping()
         print("✅ Redis connection successful")
@@ -67,8 +70,8 @@ def test_agent_creation():
         return False
     
     try:
-        from src.redis_ai_client import RedisAIClient
-        from src.agent import RedisAILangGraphAgent
+        from redis_ai_client import RedisAIClient
+        from agent import RedisAILangGraphAgent
         
         redis_client = RedisAIClient()
         agent = RedisAILangGraphAgent(redis_client, openai_api_key)
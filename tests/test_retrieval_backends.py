@@ -0,0 +1,16 @@
+from retrieval_backends import NumpyVectorBackend
+
+
+def test_numpy_search_only_returns_documents_of_the_requested_index():
+    backend = NumpyVectorBackend(dim=2)
+    backend.add([{"doc_id": "a", "text": "in rag_docs", "embedding": [1, 0]}], "rag_docs")
+    backend.add([{"doc_id": "b", "text": "in other", "embedding": [1, 0]}], "other")
+    assert [hit["id"] for hit in backend.search([1, 0], k=5, index_name="rag_docs")] == ["rag_docs:a"]
+    backend.add([{"doc_id": "c", "text": "also in other", "embedding": [0, 1]}], "other")
+    assert [hit["id"] for hit in backend.search([1, 0], k=5, index_name="other")] == ["other:b", "other:c"]
+
+
+def test_numpy_search_with_k_zero_returns_no_documents():
+    backend = NumpyVectorBackend(dim=2)
+    backend.add([{"doc_id": "a", "text": "a", "embedding": [1, 0]}])
+    assert backend.search_batch([[1, 0], [0, 1]], k=0) == [[], []]
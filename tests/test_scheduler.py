@@ -0,0 +1,27 @@
+import asyncio
+import pytest
+from scheduler import RequestScheduler, TokenBucket
+
+
+def test_large_reservations_stay_within_the_per_minute_quota():
+    per_minute = 60000
+    bucket = TokenBucket(per_minute / 60, per_minute / 60)
+    charged = 0
+    for _ in range(12):
+        delay = bucket.reserve(5000)
+        charged += 5000
+        # Tokens admitted by the time this caller may start never exceed the burst plus the refill
+        assert charged <= bucket.capacity + bucket.rate * delay + 1
+    assert delay >= 55
+
+
+def test_waiting_returns_to_zero_when_a_caller_gives_up():
+    scheduler = RequestScheduler(max_concurrent=1, requests_per_minute=60, tokens_per_minute=60000)
+
+    async def held_then_timed_out():
+        async with scheduler.aslot():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(scheduler.aslot().__aenter__(), 0.1)
+
+    asyncio.run(held_then_timed_out())
+    assert scheduler.metrics()["waiting"] == 0
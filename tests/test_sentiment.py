@@ -0,0 +1,37 @@
+import time
+import asyncio
+from sentiment import SentimentAnalyzer
+
+
+class SlowAnalyzer(SentimentAnalyzer):
+    """Analyzer whose model takes delay seconds per batch and calls everything positive"""
+
+    def __init__(self, delay: float):
+        super().__init__(ai_client=None)
+        self.delay = delay
+
+    def classify(self, texts):
+        time.sleep(self.delay)
+        self.batches += 1
+        return ["positive"] * len(texts)
+
+
+def test_async_timeout_does_not_stop_the_worker():
+    analyzer = SlowAnalyzer(delay=0.3)
+
+    async def turns():
+        first = await analyzer.aanalyze("this is great", timeout=0.1)
+        second = await analyzer.aanalyze("this is wonderful", timeout=5)
+        return first, second
+
+    assert asyncio.run(turns()) == ("neutral", "positive")
+    assert analyzer.timeouts == 1
+    assert analyzer._worker.is_alive()
+
+
+def test_failed_batch_does_not_stop_the_worker():
+    analyzer = SlowAnalyzer(delay=0)
+    analyzer.classify = lambda texts: 1 / 0
+    assert analyzer.analyze("this is great", timeout=5) == "neutral"
+    del analyzer.classify
+    assert analyzer.analyze("this is great", timeout=5) == "positive"